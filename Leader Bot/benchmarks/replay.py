@@ -0,0 +1,254 @@
+# benchmarks/replay.py
+# Banco de pruebas sin conexión: reproduce el historial real de envíos (judged_*.json / pending_*.json)
+# a través del Enrutador y los cogs de envíos, con mensajes y reacciones falsos, sobre un directorio temporal.
+# Necesita discord.py instalado (como el bot), pero no se conecta a Discord.
+# Uso (desde "Leader Bot"):  python benchmarks/replay.py [--scale N] [--concurrency C] [--data-dir DIR] [--keep] [--verbose]
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BOT_DIR)
+os.environ.setdefault("ADMIN_ROLE_ID", "1")  # Puntos exige la variable; el valor real da igual aquí.
+
+from utils.channels import CHANNEL_PREFIXES
+from utils.parser import GRID_POINTS, KEYED_POINTS
+
+# --- CONFIGURACIÓN ---
+# Tipo de envío -> sufijo de los archivos de historial (judged_<sufijo>.json / pending_<sufijo>.json).
+HISTORY_FILES = {
+    'ataque': 'attacks',
+    'defensa': 'defenses',
+    'tempo': 'tempo',
+    'interserver': 'interserver',
+}
+# Puntos primero (migraciones y libro de puntos), igual que en bot.PRIORITY_EXTENSIONS.
+REPLAY_EXTENSIONS = ('cogs.puntos', 'cogs.enrutador', 'cogs.ataque', 'cogs.defenses', 'cogs.tempo', 'cogs.interserver')
+GUILD_ID = 1
+REVIEWER_ID = 2
+FIRST_CHANNEL_ID = 1000
+FIRST_MESSAGE_ID = 1 << 40
+STATUS_EMOJIS = {'approved': '✅', 'denied': '❌'}
+
+# --- OBJETOS FALSOS (solo los atributos que usan el Enrutador y los cogs) ---
+class FakeGuild:
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+
+class FakeChannel:
+    def __init__(self, channel_id: int, name: str, guild: FakeGuild):
+        self.id = channel_id
+        self.name = name
+        self.guild = guild
+
+class FakeAttachment:
+    content_type = 'image/png'
+
+class FakeAuthor:
+    bot = False
+
+class FakeMessage:
+    """Lo que discord.Message aporta a un envío. `add_reaction` solo anota el emoji."""
+    def __init__(self, message_id: int, channel: FakeChannel, content: str):
+        self.id = message_id
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.author = FakeAuthor()
+        self.attachments = [FakeAttachment()]
+        self.reactions = []
+        self.added = []
+
+    async def add_reaction(self, emoji):
+        self.added.append(str(emoji))
+
+class FakeRole:
+    def __init__(self, role_id: int):
+        self.id = role_id
+
+class FakeMember:
+    def __init__(self, user_id: int, role_id: int):
+        self.id = user_id
+        self.bot = False
+        self.roles = [FakeRole(role_id)]
+        self.mention = f'<@{user_id}>'
+
+class FakeReactionEvent:
+    """Lo que discord.RawReactionActionEvent aporta a una revisión."""
+    def __init__(self, message: FakeMessage, emoji: str, member: FakeMember):
+        self.message_id = message.id
+        self.channel_id = message.channel.id
+        self.guild_id = message.guild.id
+        self.user_id = member.id
+        self.member = member
+        self.emoji = emoji
+
+# --- HISTORIAL ---
+def channel_name_for(kind: str, allies, points):
+    """Nombre de un canal cuya clasificación da exactamente `points` a ese número de aliados, o None."""
+    prefix = next(prefix for prefix, prefix_kind in CHANNEL_PREFIXES if prefix_kind == kind)
+    grid = GRID_POINTS.get(kind)
+    if grid is not None:
+        if not 1 <= len(allies) <= len(grid):
+            return None
+        for enemies, grid_points in enumerate(grid[len(allies) - 1]):
+            if grid_points == points:
+                return f'{prefix}vs{enemies}'
+        return None
+    for key, key_points in KEYED_POINTS[kind].items():
+        if key_points == points:
+            return f'{prefix}{key}'
+    return None
+
+def _load_history_file(source_dir: str, filename: str):
+    # Si el bot ya arrancó en ese directorio, los JSON se importaron a la base de datos y se renombraron.
+    for path in (os.path.join(source_dir, filename), os.path.join(source_dir, filename + '.imported')):
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+    return {}
+
+def load_history(source_dir: str):
+    """
+    Devuelve (registros, descartados). Cada registro es (message_id, tipo, nombre_de_canal, aliados, estado),
+    en orden cronológico; `estado` es None para los pendientes. Se descartan los que ningún canal reproduce.
+    """
+    records, skipped = [], 0
+    for kind, suffix in HISTORY_FILES.items():
+        for prefix in ('judged', 'pending'):
+            for message_id, submission in _load_history_file(source_dir, f'{prefix}_{suffix}.json').items():
+                allies = submission.get('allies') or []
+                channel_name = channel_name_for(kind, allies, submission.get('points'))
+                if channel_name is None:
+                    skipped += 1
+                    continue
+                records.append((int(message_id), kind, channel_name, allies, submission.get('status')))
+    records.sort()
+    return records, skipped
+
+# --- MEDICIÓN ---
+def _bytes_written() -> int:
+    """Bytes pasados a write() por el proceso (Linux); None si no está disponible."""
+    try:
+        with open('/proc/self/io', 'r') as f:
+            for line in f:
+                if line.startswith('wchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+def _percentile(sorted_values, q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+# --- REPRODUCCIÓN ---
+async def replay(records, scale: int, concurrency: int):
+    """Reproduce el historial `scale` veces. Devuelve (latencias por (evento, tipo), eventos, segundos, aceptados, bytes)."""
+    from bot import KompanyBot
+    import cogs.enrutador as enrutador
+
+    guild = FakeGuild(GUILD_ID)
+    reviewer = FakeMember(REVIEWER_ID, enrutador.ADMIN_ROLE_ID)
+    channel_ids = itertools.count(FIRST_CHANNEL_ID)
+    channels = {}
+    latencies = {}
+    accepted = 0
+
+    written_before = _bytes_written()
+    async with KompanyBot() as bot:
+        for name in REPLAY_EXTENSIONS:
+            await bot.load_extension(name)
+        router = bot.get_cog('Enrutador')
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def timed(event: str, kind: str, handler, arg):
+            started = time.perf_counter()
+            await handler(arg)
+            latencies.setdefault((event, kind), []).append(time.perf_counter() - started)
+
+        async def replay_one(message_id: int, kind: str, channel_name: str, allies, status):
+            nonlocal accepted
+            channel = channels.get(channel_name)
+            if channel is None:
+                channel = channels[channel_name] = FakeChannel(next(channel_ids), channel_name, guild)
+            message = FakeMessage(message_id, channel, ' '.join(f'<@{user_id}>' for user_id in allies))
+            async with semaphore:
+                await timed('on_message', kind, router.on_message, message)
+                if message.added[-1:] == ['📝']:
+                    accepted += 1
+                if status in STATUS_EMOJIS:
+                    await timed('on_raw_reaction_add', kind, router.on_raw_reaction_add,
+                                FakeReactionEvent(message, STATUS_EMOJIS[status], reviewer))
+
+        message_ids = itertools.count(FIRST_MESSAGE_ID)
+        started = time.perf_counter()
+        await asyncio.gather(*(replay_one(next(message_ids), kind, channel_name, allies, status)
+                               for _ in range(scale) for _, kind, channel_name, allies, status in records))
+        elapsed = time.perf_counter() - started
+    # Al salir del bloque, KompanyBot.close() vacía el libro de puntos y los archivos de estado.
+    written_after = _bytes_written()
+    written = written_after - written_before if written_before is not None else None
+    events = sum(len(values) for values in latencies.values())
+    return latencies, events, elapsed, accepted, written
+
+def report(latencies, events: int, elapsed: float, accepted: int, messages: int, written, data_dir: str):
+    print(f"\n{'evento':<22}{'tipo':<13}{'n':>7}{'p50 ms':>10}{'p99 ms':>10}")
+    all_values = []
+    for (event, kind), values in sorted(latencies.items()):
+        values.sort()
+        all_values.extend(values)
+        print(f"{event:<22}{kind:<13}{len(values):>7}{_percentile(values, 0.5) * 1000:>10.2f}{_percentile(values, 0.99) * 1000:>10.2f}")
+    all_values.sort()
+    if all_values:
+        print(f"{'total':<35}{len(all_values):>7}{_percentile(all_values, 0.5) * 1000:>10.2f}{_percentile(all_values, 0.99) * 1000:>10.2f}")
+    print(f"\nEventos: {events} en {elapsed:.2f} s ({events / elapsed:,.0f} eventos/s)")
+    print(f"Envíos aceptados: {accepted} de {messages}")
+    if written is not None:
+        print(f"Bytes escritos (wchar): {written:,}")
+    print(f"Tamaño final del directorio de datos: {_dir_size(data_dir):,} bytes")
+
+async def main(args):
+    records, skipped = load_history(args.source)
+    if not records:
+        print(f"No se encontró historial reproducible en {args.source}.")
+        return
+    print(f"{len(records)} envíos en el historial ({skipped} descartados) × {args.scale} = {len(records) * args.scale} mensajes")
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='leaderbot-replay-')
+    os.makedirs(data_dir, exist_ok=True)
+    previous_dir = os.getcwd()
+    os.chdir(data_dir)  # leaderboard.db y los archivos de estado usan rutas relativas.
+    try:
+        # Los cogs imprimen una línea por envío: se silencian para no medir la consola.
+        quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with quiet:
+            latencies, events, elapsed, accepted, written = await replay(records, args.scale, args.concurrency)
+        report(latencies, events, elapsed, accepted, len(records) * args.scale, written, data_dir)
+    finally:
+        os.chdir(previous_dir)
+        if args.keep or args.data_dir:
+            print(f"Datos en {data_dir}")
+        else:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Reproduce el historial de envíos contra el bot sin conexión')
+    parser.add_argument('--source', default=BOT_DIR, help='directorio con judged_*.json y pending_*.json')
+    parser.add_argument('--scale', type=int, default=1, help='veces que se reproduce el historial')
+    parser.add_argument('--concurrency', type=int, default=8, help='envíos en vuelo a la vez')
+    parser.add_argument('--data-dir', help='directorio de datos (por defecto, uno temporal que se borra al terminar)')
+    parser.add_argument('--keep', action='store_true', help='no borrar el directorio temporal')
+    parser.add_argument('--verbose', action='store_true', help='mostrar la salida del bot')
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -0,0 +1,106 @@
+# benchmarks/test_parser_bench.py
+# Benchmarks del parser de envíos (utils/parser.py) con presupuesto de tiempo: una regresión hace fallar la ejecución.
+# No necesita discord ni el bot en marcha.
+# Uso (desde "Leader Bot"):  python -m pytest benchmarks/test_parser_bench.py
+#                            python benchmarks/test_parser_bench.py [--repeat R]   (solo imprime la tabla)
+# PARSER_BENCH_SLACK multiplica los presupuestos (p. ej. 3 en máquinas lentas o compartidas).
+import argparse
+import os
+import sys
+import timeit
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.channels import classify_channel
+from utils.parser import parse_content
+
+# --- CONFIGURACIÓN ---
+SLACK = float(os.getenv("PARSER_BENCH_SLACK", 1.0))
+# Presupuesto por llamada: base + coste por mención + coste por cada 1000 caracteres (µs).
+# Unas 5-10 veces lo medido en un portátil normal: solo salta con regresiones reales.
+BUDGET_BASE_US = 20.0
+BUDGET_PER_MENTION_US = 1.0
+BUDGET_PER_KCHAR_US = 5.0
+# Al multiplicar la entrada por 10, el tiempo no puede crecer más de 10 × LINEAR_SLACK (detecta costes cuadráticos).
+LINEAR_SLACK = 3.0
+MENTION_COUNTS = (1, 5, 50, 500)
+FILLER_KCHARS = (0, 1, 10, 100)
+
+def _mentions(n: int) -> str:
+    return ' '.join(f'<@{100000000000000000 + i}>' for i in range(n))
+
+def _filler(kchars: int) -> str:
+    return 'lorem ipsum ' * (kchars * 1000 // 12)
+
+def _info(channel_name: str):
+    channel_id = int(os.getenv("KOTH_CHANNEL_ID", 0)) if channel_name == 'koth' else 1
+    return classify_channel(channel_id, channel_name)
+
+def per_call(content: str, image: bool, info, number: int = None, repeat: int = 5) -> float:
+    """Mejor tiempo por llamada (segundos) de parse_content, ajustando el número de llamadas al tamaño."""
+    if number is None:
+        number = max(20, 20000 // (1 + len(content) // 100))
+    return min(timeit.repeat(lambda: parse_content(content, image, info), number=number, repeat=repeat)) / number
+
+def budget(mentions: int, kchars: float) -> float:
+    return (BUDGET_BASE_US + BUDGET_PER_MENTION_US * mentions + BUDGET_PER_KCHAR_US * kchars) * SLACK / 1e6
+
+# (nombre del caso, contenido, ¿imagen?, nombre del canal)
+CASES = [
+    ('ataque-3-aliados', f'{_mentions(3)} gg', True, 'attack-vs4'),
+    ('defensa-0-enemigos', f'{_mentions(2)}', True, 'defenses-vs0'),
+    ('tempo', f'{_mentions(4)} buena partida', True, 'tempo-15-20min'),
+    ('interserver', f'{_mentions(5)}', True, 'interserver-v4-v5'),
+    ('koth', f'{_mentions(8)}', True, 'koth'),
+    ('sin-imagen', f'{_mentions(3)}', False, 'attack-vs2'),
+    ('demasiados-aliados', _mentions(40), True, 'attack-vs5'),
+]
+
+# --- TESTS ---
+@pytest.mark.parametrize('name, content, image, channel_name', CASES, ids=[case[0] for case in CASES])
+def test_cases_within_budget(name, content, image, channel_name):
+    elapsed = per_call(content, image, _info(channel_name))
+    limit = budget(content.count('<@'), len(content) / 1000)
+    assert elapsed <= limit, f"{name}: {elapsed * 1e6:.2f} µs/llamada > presupuesto {limit * 1e6:.2f} µs"
+
+@pytest.mark.parametrize('mentions', MENTION_COUNTS)
+def test_mentions_within_budget(mentions):
+    content = _mentions(mentions)
+    elapsed = per_call(content, True, _info('attack-vs3'))
+    assert elapsed <= budget(mentions, len(content) / 1000), f"{mentions} menciones: {elapsed * 1e6:.2f} µs/llamada"
+
+@pytest.mark.parametrize('kchars', FILLER_KCHARS)
+def test_long_text_within_budget(kchars):
+    content = _filler(kchars) + _mentions(3)
+    elapsed = per_call(content, True, _info('attack-vs3'))
+    assert elapsed <= budget(3, kchars), f"{kchars}k caracteres: {elapsed * 1e6:.2f} µs/llamada"
+
+@pytest.mark.parametrize('small, large', [(50, 500)])
+def test_mentions_scale_linearly(small, large):
+    info = _info('attack-vs3')
+    ratio = per_call(_mentions(large), True, info) / per_call(_mentions(small), True, info)
+    assert ratio <= (large / small) * LINEAR_SLACK * SLACK, f"×{large // small} menciones → ×{ratio:.1f} tiempo"
+
+@pytest.mark.parametrize('small, large', [(10, 100)])
+def test_text_scales_linearly(small, large):
+    info = _info('attack-vs3')
+    ratio = per_call(_filler(large) + _mentions(3), True, info) / per_call(_filler(small) + _mentions(3), True, info)
+    assert ratio <= (large / small) * LINEAR_SLACK * SLACK, f"×{large // small} texto → ×{ratio:.1f} tiempo"
+
+# --- TABLA (sin pytest) ---
+def run(repeat: int):
+    print(f"{'caso':<22}{'µs/op':>10}{'presupuesto':>13}")
+    rows = [(name, content, image, _info(channel_name)) for name, content, image, channel_name in CASES]
+    rows += [(f'{n}-menciones', _mentions(n), True, _info('attack-vs3')) for n in MENTION_COUNTS]
+    rows += [(f'{k}k-caracteres', _filler(k) + _mentions(3), True, _info('attack-vs3')) for k in FILLER_KCHARS]
+    for name, content, image, info in rows:
+        elapsed = per_call(content, image, info, repeat=repeat)
+        limit = budget(content.count('<@'), len(content) / 1000)
+        print(f"{name:<22}{elapsed * 1e6:>10.2f}{limit * 1e6:>13.2f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark del parser de envíos')
+    parser.add_argument('--repeat', type=int, default=5, help='repeticiones (se toma la mejor)')
+    args = parser.parse_args()
+    run(args.repeat)
@@ -3,7 +3,19 @@ import discord
 from discord.ext import commands
 import os
 import asyncio
+import time
 from dotenv import load_dotenv
+from utils.database import Database
+from utils.names import NameResolver
+from utils.submissions import SubmissionStore
+from utils.state import state_writer
+from utils.channels import ChannelMap
+from utils.reactions import ReactionCleaner
+from utils.audit import AuditLog
+from utils.marks import ChannelMarks
+from utils.command_sync import sync_if_changed
+from utils.seasons import Seasons
+from utils.metrics import Metrics
 
 # --- Carga de Variables de Entorno ---
 # Esto buscará un archivo llamado exactamente ".env"
@@ -15,6 +27,10 @@ else:
 
 TOKEN = os.getenv("DISCORD_TOKEN")
 TEST_GUILD_ID = int(os.getenv("TEST_GUILD_ID", 0))
+DB_FILE = 'leaderboard.db'
+# Extensiones que se cargan primero y en este orden, porque otras las usan al cargar o al procesar
+# (Puntos aplica las migraciones y recibe los puntos de todos los envíos). El resto se carga en paralelo.
+PRIORITY_EXTENSIONS = ('cogs.puntos',)
 
 # --- SUBCLASE DE BOT PERSONALIZADA ---
 # Crear una subclase de commands.Bot nos permite usar el `setup_hook`
@@ -26,8 +42,31 @@ class KompanyBot(commands.Bot):
         intents.message_content = True
         intents.guilds = True
         intents.reactions = True
+        # Métricas (utils/metrics.py): se crean antes para medir también las peticiones REST del cliente.
+        self.metrics = Metrics(self)
         # Llamamos al constructor de la clase padre (commands.Bot)
-        super().__init__(command_prefix='!', intents=intents)
+        super().__init__(command_prefix='!', intents=intents, http_trace=self.metrics.trace_config())
+        # Servicio de base de datos compartido por todos los cogs (ver utils/database.py).
+        self.db = Database(DB_FILE)
+        self.db.observers.append(self.metrics.observe_query)
+        # Caché de nombres visibles compartida (ranking, registros, anuncios de temporada).
+        self.names = NameResolver()
+        # Envíos pendientes y juzgados de todos los cogs (tabla `submissions`).
+        self.submissions = SubmissionStore(self.db)
+        # Clasificación de canales de envíos (tipo, enemigos, tramo...), calculada una vez por canal.
+        self.channel_map = ChannelMap()
+        # Cola de limpieza de reacciones opuestas tras juzgar un envío.
+        self.reaction_cleaner = ReactionCleaner(self)
+        # Registro de auditoría agrupado (canal BOT_AUDIT_LOGS_CHANNEL_ID), con respaldo en disco.
+        self.audit = AuditLog(self)
+        # Último mensaje procesado por canal de envíos, para ponerse al día tras una caída.
+        self.channel_marks = ChannelMarks(self.db)
+        # Temporada actual y cambios de temporada sobre la misma base de datos (ver utils/seasons.py).
+        self.seasons = Seasons(self.db)
+        # Tiempos de arranque por cog: nombre -> {'load', 'cog_load', 'ready'} (ver load_extensions).
+        self.startup_timings = {}
+        self._startup_started = None
+        self._loading = {}  # extensión -> inicio de load_extension
 
     async def setup_hook(self):
         """
@@ -35,35 +74,103 @@ class KompanyBot(commands.Bot):
         pero antes de que esté completamente listo. Es el lugar perfecto para
         cargar cogs y sincronizar comandos.
         """
+        # Endpoint de métricas (solo si METRICS_PORT está definido) y medición del event loop.
+        await self.metrics.start()
+        # Envía lo que quedó pendiente del registro de auditoría en la ejecución anterior.
+        await self.audit.restore()
+
         print("--- Cargando Módulos (Cogs) ---")
-        for filename in os.listdir('./cogs'):
-            if filename.endswith('.py') and not filename.startswith('__'):
-                extension_name = f'cogs.{filename[:-3]}'
-                try:
-                    await self.load_extension(extension_name)
-                    print(f"✅ Módulo '{filename}' cargado exitosamente.")
-                except Exception as e:
-                    print(f"❌ Error al cargar el módulo '{filename}':")
-                    print(f"   - {type(e).__name__}: {e}")
+        await self.load_extensions()
         
         print("\n--- Sincronizando comandos de barra (Slash Commands) ---")
         # Sincronizamos los comandos DESPUÉS de haber cargado todos los cogs.
         # Esto garantiza que todos los comandos se registren antes de la sincronización.
+        # Solo se llama a Discord si el árbol cambió desde la última vez (FORCE_COMMAND_SYNC=1 para forzarlo).
         try:
             if TEST_GUILD_ID != 0:
                 # Sincronización específica para el servidor de pruebas (instantánea).
                 guild = discord.Object(id=TEST_GUILD_ID)
                 self.tree.copy_global_to(guild=guild)
-                synced_commands = await self.tree.sync(guild=guild)
-                print(f"✅ ¡Se sincronizaron {len(synced_commands)} comandos para el servidor de pruebas!")
+                target = "para el servidor de pruebas"
             else:
                 # Sincronización global (puede tardar hasta 1 hora).
-                synced_commands = await self.tree.sync()
-                print(f"✅ ¡Se sincronizaron {len(synced_commands)} comandos globalmente!")
+                guild = None
+                target = "globalmente"
+            synced, elapsed, saved = await sync_if_changed(self, guild)
+            if synced is None:
+                print(f"✅ Comandos sin cambios {target}: sincronización omitida ({elapsed * 1000:.0f} ms, ~{saved:.1f} s ahorrados).")
+            else:
+                print(f"✅ ¡Se sincronizaron {synced} comandos {target}! ({elapsed:.1f} s)")
 
         except Exception as e:
             print(f"❌ Error al sincronizar comandos: {e}")
 
+    async def load_extensions(self):
+        """
+        Carga las extensiones de ./cogs: primero PRIORITY_EXTENSIONS en orden y después el resto a la vez
+        (sus `cog_load` solo esperan a la base de datos). Al terminar imprime el informe de tiempos.
+        """
+        self._startup_started = time.perf_counter()
+        names = sorted(f'cogs.{filename[:-3]}' for filename in os.listdir('./cogs')
+                       if filename.endswith('.py') and not filename.startswith('__'))
+        for name in PRIORITY_EXTENSIONS:
+            if name in names:
+                await self._load_timed(name)
+        await asyncio.gather(*(self._load_timed(name) for name in names if name not in PRIORITY_EXTENSIONS))
+        self.print_startup_report()
+
+    async def _load_timed(self, extension_name: str):
+        filename = f"{extension_name.split('.')[-1]}.py"
+        try:
+            self._loading[extension_name] = time.perf_counter()
+            await self.load_extension(extension_name)
+            print(f"✅ Módulo '{filename}' cargado exitosamente.")
+        except Exception as e:
+            print(f"❌ Error al cargar el módulo '{filename}':")
+            print(f"   - {type(e).__name__}: {e}")
+        finally:
+            self._loading.pop(extension_name, None)
+
+    async def add_cog(self, cog, **kwargs):
+        """
+        Igual que commands.Bot.add_cog, pero mide las fases de la extensión que lo añade:
+        load = load_extension hasta llegar aquí (importación del módulo y de sus dependencias aún no cargadas,
+        `setup()` y constructor del cog),
+        cog_load = `cog_load` y registro de comandos, ready = momento en que queda listo desde el inicio de la carga.
+        """
+        entered = time.perf_counter()
+        await super().add_cog(cog, **kwargs)
+        done = time.perf_counter()
+        extension_name = type(cog).__module__
+        loaded_from = self._loading.get(extension_name)
+        if loaded_from is not None:
+            self.startup_timings[cog.qualified_name] = {
+                'load': entered - loaded_from,
+                'cog_load': done - entered,
+                'ready': done - self._startup_started,
+            }
+
+    def print_startup_report(self):
+        total = time.perf_counter() - self._startup_started
+        print("\n--- Tiempos de arranque (ms) ---")
+        print(f"{'Cog':<14}{'load':>10}{'cog_load':>10}{'ready':>10}")
+        for name, timing in sorted(self.startup_timings.items(), key=lambda item: item[1]['ready']):
+            print(f"{name:<14}{timing['load'] * 1000:>10.1f}{timing['cog_load'] * 1000:>10.1f}{timing['ready'] * 1000:>10.1f}")
+        print(f"Total: {total * 1000:.1f} ms")
+
+    async def close(self):
+        """
+        Envía lo pendiente del registro de auditoría, cierra la conexión con Discord y, después,
+        vacía los archivos de estado y cierra la base de datos.
+        """
+        await self.audit.close()
+        await super().close()
+        await self.reaction_cleaner.close()
+        await self.channel_marks.flush()
+        await state_writer.flush()
+        await self.metrics.close()
+        self.db.close()
+
     async def on_ready(self):
         """
         Este evento se dispara cuando el bot está completamente listo y operativo.
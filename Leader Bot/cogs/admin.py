@@ -1,33 +1,75 @@
 # cogs/admin.py (Final)
 import discord
 from discord import app_commands
-from discord.ext import commands, tasks
-from datetime import datetime, timezone
-import json
+from discord.ext import commands
+from datetime import datetime, timedelta, timezone
+import asyncio
+import cProfile
+import io
 import os
+import pstats
+import time
 import traceback
+import tracemalloc
+from utils.channels import KIND_COGS
+from utils.state import load_json, save_json
+from utils.command_sync import sync_if_changed
 
 # --- CONFIGURACIÓN ---
 ADMIN_ROLE_ID = int(os.getenv("ADMIN_ROLE_ID", 0))
 KOTH_CHANNEL_ID = int(os.getenv("KOTH_CHANNEL_ID", 0))
 TEST_GUILD_ID = int(os.getenv("TEST_GUILD_ID", 0))
 STATUS_FILE = 'bot_status.json'
+SCAN_CONCURRENCY = 4 # Canales cuyo historial se lee a la vez.
+CATCH_UP_FALLBACK_HOURS = int(os.getenv("CATCH_UP_FALLBACK_HOURS", 24)) # Historial máximo que se relee en canales sin marca (0 = ninguno).
+PROFILE_MAX_SECONDS = 300 # Ventana máxima de /debug profile (el token de la interacción dura 15 minutos).
+PROFILE_TOP_FUNCTIONS = 40
+PROFILE_TOP_ALLOCATIONS = 25
 
 # --- FUNCIONES DE AYUDA ---
 def load_status():
-    """Carga el estado del bot (como la última vez que estuvo online)."""
-    try:
-        with open(STATUS_FILE, 'r') as f: return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError): return {}
+    """
+    Carga el estado del bot. `last_online` ya no se actualiza (la recuperación usa las marcas
+    por canal de utils/marks.py); solo sirve de punto de partida para canales aún sin marca.
+    """
+    return load_json(STATUS_FILE, {})
 
 def save_status(data):
-    """Guarda el estado del bot."""
-    with open(STATUS_FILE, 'w') as f: json.dump(data, f, indent=4)
+    """Guarda el estado del bot (escritura atómica y agrupada, ver utils/state.py)."""
+    save_json(STATUS_FILE, data)
+
+def owner_only():
+    """Check de comandos de barra: solo el dueño de la aplicación (si no, CheckFailure)."""
+    async def predicate(interaction: discord.Interaction) -> bool:
+        return await interaction.client.is_owner(interaction.user)
+    return app_commands.check(predicate)
+
+def build_profile_report(profiler: cProfile.Profile, snapshot, peak: int, seconds: int) -> str:
+    """Texto del informe de /debug profile: funciones por tiempo acumulado y sitios que más memoria reservaron."""
+    out = io.StringIO()
+    out.write(f"Perfil de {seconds} s tomado el {datetime.now(timezone.utc).isoformat()}\n\n")
+    out.write(f"=== Top {PROFILE_TOP_FUNCTIONS} funciones por tiempo acumulado (cProfile, hilo del event loop) ===\n")
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP_FUNCTIONS)
+
+    out.write(f"\n=== Top {PROFILE_TOP_ALLOCATIONS} sitios de reserva de memoria aún vivos (tracemalloc) ===\n")
+    out.write(f"Pico de memoria trazada durante la ventana: {peak / 1024:.1f} KiB\n")
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, cProfile.__file__),
+    ))
+    for stat in snapshot.statistics('lineno')[:PROFILE_TOP_ALLOCATIONS]:
+        frame = stat.traceback[0]
+        out.write(f"{stat.size / 1024:10.1f} KiB {stat.count:8d} bloques  {frame.filename}:{frame.lineno}\n")
+    return out.getvalue()
 
 @app_commands.guild_only()
 class Admin(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self._scan_lock = asyncio.Lock()
+        self._profile_lock = asyncio.Lock()
+        self._caught_up = False
         
         # --- REGISTRO DEL COMANDO DE MENÚ CONTEXTUAL ---
         # Este comando aparece al hacer clic derecho en un mensaje.
@@ -36,97 +78,221 @@ class Admin(commands.Cog):
             callback=self.process_manually_callback,
         )
         self.bot.tree.add_command(self.process_manually_ctx_menu, guild=discord.Object(id=TEST_GUILD_ID))
-        
-        self.update_last_online_time.start()
+
+    async def cog_load(self):
+        # La recuperación de on_ready retiene las marcas de canal hasta empezar (solo si aún no se conectó).
+        if not self.bot.is_ready():
+            self.bot.channel_marks.expect_catch_up()
 
     def cog_unload(self):
         """Función de limpieza que se ejecuta si el cog se descarga."""
+        self.bot.channel_marks.resume()
         self.bot.tree.remove_command(self.process_manually_ctx_menu.name, type=self.process_manually_ctx_menu.type, guild=discord.Object(id=TEST_GUILD_ID))
-        self.update_last_online_time.cancel()
 
-    @tasks.loop(minutes=5.0)
-    async def update_last_online_time(self):
-        """Tarea que actualiza cada 5 minutos la marca de tiempo de la última vez que el bot estuvo activo."""
-        await self.bot.wait_until_ready()
-        status = load_status()
-        status['last_online'] = datetime.now(timezone.utc).isoformat()
-        save_status(status)
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Al arrancar, reprocesa automáticamente lo publicado en cada canal de envíos después de su marca."""
+        if self._caught_up:
+            return # on_ready se repite en cada reconexión; la recuperación solo hace falta una vez.
+        self._caught_up = True
+        async with self._scan_lock:
+            started = time.perf_counter()
+            try:
+                results = await self.catch_up(self.bot.guilds, self._fallback_after(), hold=True)
+            finally:
+                self.bot.channel_marks.resume() # Si falla antes de retener los canales, las marcas no se quedan paradas.
+            elapsed = time.perf_counter() - started
+        found = sum(found for _, found, _, _ in results)
+        print(f"✅ Recuperación de envíos: {found} envíos nuevos en {len(results)} canales ({elapsed:.1f} s).")
+        for channel, found, read, error in results:
+            if error:
+                print(f"   - #{channel.name}: {error}")
+            elif found:
+                print(f"   - #{channel.name}: {found} envíos ({read} mensajes leídos).")
 
     # --- COMANDOS SLASH ---
     @app_commands.command(name="scan_offline", description="Escanea canales en busca de envíos hechos mientras el bot estaba desconectado.")
     @app_commands.checks.has_role(ADMIN_ROLE_ID)
     async def scan_offline_submissions(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True, thinking=True)
+        if self._scan_lock.locked():
+            return await interaction.followup.send("⏳ Ya hay un escaneo en curso.")
+
+        async with self._scan_lock:
+            started = time.perf_counter()
+            results = await self.catch_up([interaction.guild], self._fallback_after())
+            elapsed = time.perf_counter() - started
+
         status = load_status()
-        last_active_str = status.get('last_online')
-        if not last_active_str:
-            return await interaction.followup.send("No hay una marca de tiempo de la última conexión.")
+        status['last_scan'] = datetime.now(timezone.utc).isoformat()
+        save_status(status)
 
-        after_timestamp = datetime.fromisoformat(last_active_str)
-        processed_count = 0
+        processed_count = sum(found for _, found, _, _ in results)
         scan_report = []
+        for channel, found, read, error in results:
+            if error:
+                scan_report.append(f"`#{channel.name}`: {error}")
+            elif found:
+                scan_report.append(f"`#{channel.name}`: {found} envíos encontrados ({read} mensajes leídos).")
+        header = (f"✅ **Escaneo completado** en {elapsed:.1f} s.\n"
+                  f"Se procesaron **{processed_count}** nuevos envíos en {len(results)} canales "
+                  f"({sum(read for _, _, read, _ in results)} mensajes leídos).\n\n**Reporte:**\n- ")
+        body = "\n- ".join(scan_report if scan_report else ["No se encontraron nuevos envíos."])
+        if len(header) + len(body) > 2000:
+            body = body[:1990 - len(header)] + "\n…"
+        await interaction.followup.send(header + body)
 
-        # Mapeo de nombres de Cog a identificadores de canal.
-        cogs_to_scan = {'Ataque': 'attack-', 'Defensa': 'defenses-', 'Koth': KOTH_CHANNEL_ID, 'Tempo': 'tempo-', 'Interserver': 'interserver-'}
-
-        for cog_name, identifier in cogs_to_scan.items():
-            cog = self.bot.get_cog(cog_name)
-            if not cog or not hasattr(cog, 'process_submission'): continue
-            
-            for channel in interaction.guild.text_channels:
-                is_target_channel = (isinstance(identifier, str) and channel.name.lower().startswith(identifier)) or \
-                                    (isinstance(identifier, int) and channel.id == identifier)
-                
-                if is_target_channel:
-                    try:
-                        found_in_channel = 0
-                        # Escanea los últimos 200 mensajes desde que el bot estuvo online.
-                        async for message in channel.history(limit=200, after=after_timestamp, oldest_first=True):
-                            if not message.author.bot:
-                                try:
-                                    if await cog.process_submission(message):
-                                        processed_count += 1
-                                        found_in_channel += 1
-                                except Exception as e:
-                                    print(f"Error al procesar mensaje {message.id} en {cog_name}: {e}")
-                        
-                        if found_in_channel > 0:
-                            scan_report.append(f"Canal `#{channel.name}`: {found_in_channel} envíos encontrados.")
-                    except discord.Forbidden:
-                        scan_report.append(f"No tengo permisos para ver `#{channel.name}`.")
-                    except Exception as e:
-                        scan_report.append(f"Error en `#{channel.name}`: {e}")
+    def _fallback_after(self):
+        """
+        Punto de partida para canales sin marca: la última conexión registrada por versiones anteriores,
+        pero nunca más de CATCH_UP_FALLBACK_HOURS atrás (`last_online` ya no avanza). None si no hay ninguna.
+        """
+        last_online = load_status().get('last_online')
+        if not last_online or CATCH_UP_FALLBACK_HOURS <= 0:
+            return None
+        last_online = datetime.fromisoformat(last_online)
+        if last_online.tzinfo is None:
+            last_online = last_online.replace(tzinfo=timezone.utc)
+        return max(last_online, datetime.now(timezone.utc) - timedelta(hours=CATCH_UP_FALLBACK_HOURS))
 
-        status['last_scan'] = datetime.now(timezone.utc).isoformat()
-        save_status(status)
-        await interaction.followup.send(f"✅ **Escaneo completado.**\nSe procesaron **{processed_count}** nuevos envíos.\n\n**Reporte:**\n- " + "\n- ".join(scan_report if scan_report else ["No se encontraron nuevos envíos."]))
+    async def catch_up(self, guilds, fallback_after: datetime = None, hold: bool = False):
+        """
+        Lee el historial de los canales de envíos posterior a la marca de cada canal (utils/marks.py),
+        SCAN_CONCURRENCY canales a la vez y sin límite de mensajes, y pasa cada mensaje al Cog que
+        corresponde. La marca avanza con cada mensaje reprocesado, así que una recuperación
+        interrumpida continúa donde se quedó. Los canales sin marca empiezan en `fallback_after`;
+        si tampoco hay, se marcan en su último mensaje sin reprocesar nada.
+        Con `hold=True` (arranque) las marcas de estos canales no avanzan con mensajes en vivo hasta
+        terminar su recuperación. Devuelve [(canal, envíos, mensajes leídos, error)].
+        """
+        marks = self.bot.channel_marks
+
+        # Una sola pasada de clasificación: canal -> (Cog, ChannelInfo, desde dónde leer).
+        targets = []
+        for guild in guilds:
+            for channel in guild.text_channels:
+                channel_info = self.bot.channel_map.get(channel)
+                if channel_info is None:
+                    continue
+                cog = self.bot.get_cog(KIND_COGS[channel_info.kind])
+                if not cog or not hasattr(cog, 'process_submission'):
+                    continue
+                mark = marks.get(channel.id)
+                if mark is not None:
+                    after = discord.Object(id=mark)
+                elif fallback_after is not None:
+                    after = fallback_after
+                else:
+                    if channel.last_message_id:
+                        marks.replayed(guild.id, channel.id, channel.last_message_id)
+                    continue
+                targets.append((channel, cog, channel_info, after))
+
+        if hold:
+            marks.hold(channel.id for channel, _, _, _ in targets)
+
+        semaphore = asyncio.Semaphore(SCAN_CONCURRENCY)
+
+        async def scan_channel(channel, cog, channel_info, after):
+            found = read = 0
+            async with semaphore:
+                try:
+                    async for message in channel.history(limit=None, after=after, oldest_first=True):
+                        read += 1
+                        if not message.author.bot:
+                            try:
+                                if await cog.process_submission(message, channel_info):
+                                    found += 1
+                            except Exception as e:
+                                print(f"Error al procesar mensaje {message.id} en {cog.qualified_name}: {e}")
+                        marks.replayed(channel.guild.id, channel.id, message.id)
+                except discord.Forbidden:
+                    # Sin permisos no hay nada que retomar.
+                    marks.release(channel.id)
+                    return channel, found, read, "no tengo permisos para leer el historial."
+                except Exception as e:
+                    # El canal sigue retenido: el próximo arranque lo retoma desde el último mensaje reprocesado.
+                    return channel, found, read, f"error: {e}"
+            marks.release(channel.id)
+            return channel, found, read, None
+
+        results = await asyncio.gather(*(scan_channel(*target) for target in targets))
+        await marks.flush()
+        return results
 
     @app_commands.command(name="sync", description="Sincroniza manualmente los comandos de barra con Discord.")
-    @commands.is_owner() # CORRECCIÓN FINAL: El decorador correcto es de `commands`, no de `app_commands`.
-    async def sync_commands(self, interaction: discord.Interaction):
+    @app_commands.describe(forzar="Sincroniza aunque los comandos no hayan cambiado.")
+    @owner_only() # `commands.is_owner()` no se evalúa en los comandos de barra.
+    async def sync_commands(self, interaction: discord.Interaction, forzar: bool = False):
         await interaction.response.defer(ephemeral=True)
         try:
             guild_obj = discord.Object(id=TEST_GUILD_ID) if TEST_GUILD_ID != 0 else None
-            synced = await self.bot.tree.sync(guild=guild_obj)
-            await interaction.followup.send(f"✅ Sincronizados {len(synced)} comandos.")
+            synced, elapsed, saved = await sync_if_changed(self.bot, guild_obj, force=forzar)
+            if synced is None:
+                await interaction.followup.send("ℹ️ Los comandos no han cambiado desde la última sincronización. Usa `forzar: True` para sincronizar igualmente.")
+            else:
+                await interaction.followup.send(f"✅ Sincronizados {synced} comandos en {elapsed:.1f} s.")
         except Exception as e:
             await interaction.followup.send(f"❌ Error al sincronizar: {e}")
 
+    @app_commands.command(name="db_stats", description="Muestra la latencia acumulada de las consultas a la base de datos.")
+    @owner_only()
+    async def db_stats(self, interaction: discord.Interaction):
+        report = self.bot.db.stats_report()
+        if not report:
+            return await interaction.response.send_message("Aún no se ha ejecutado ninguna consulta.", ephemeral=True)
+        lines = [f"`{label}` — {count}x · media {avg:.2f} ms · máx {peak:.2f} ms · espera {wait:.2f} ms"
+                 for label, count, avg, peak, wait in report[:20]]
+        embed = discord.Embed(title="📊 Latencia de la Base de Datos", description="\n".join(lines), color=discord.Color.blue())
+        names = self.bot.names.stats()
+        embed.set_footer(text=f"Caché de nombres: {names['hits']} aciertos · {names['misses']} fallos · {names['size']} entradas")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    # --- DEPURACIÓN ---
+    debug = app_commands.Group(name="debug", description="Herramientas de diagnóstico del bot en marcha.")
+
+    @debug.command(name="profile", description="Perfila el bot durante unos segundos y devuelve un informe.")
+    @app_commands.describe(seconds=f"Duración de la ventana (1-{PROFILE_MAX_SECONDS} s).")
+    @owner_only()
+    async def debug_profile(self, interaction: discord.Interaction, seconds: app_commands.Range[int, 1, PROFILE_MAX_SECONDS]):
+        """
+        cProfile y tracemalloc solo están activos durante la ventana pedida: fuera de ella no hay
+        ningún coste. El informe (funciones por tiempo acumulado y sitios de reserva) se adjunta como archivo.
+        """
+        if self._profile_lock.locked():
+            return await interaction.response.send_message("⏳ Ya hay un perfilado en curso.", ephemeral=True)
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        async with self._profile_lock:
+            # Si tracemalloc ya estaba activo (p. ej. PYTHONTRACEMALLOC) no se detiene al terminar.
+            owns_tracemalloc = not tracemalloc.is_tracing()
+            if owns_tracemalloc:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                profiler.disable()
+                snapshot = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                if owns_tracemalloc:
+                    tracemalloc.stop()
+
+        report = await asyncio.to_thread(build_profile_report, profiler, snapshot, peak, seconds)
+        filename = f"profile-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.txt"
+        await interaction.followup.send(f"📈 Perfil de {seconds} s.", file=discord.File(io.BytesIO(report.encode('utf-8')), filename=filename))
+
     # --- FUNCIÓN CALLBACK PARA EL MENÚ DE CONTEXTO ---
     async def process_manually_callback(self, interaction: discord.Interaction, message: discord.Message):
         if not any(role.id == ADMIN_ROLE_ID for role in interaction.user.roles):
             return await interaction.response.send_message("❌ No tienes el rol de administrador necesario.", ephemeral=True)
         
         await interaction.response.defer(ephemeral=True, thinking=True)
-        channel_name = message.channel.name.lower()
-        target_cog_name = None
-
-        # Determina qué Cog debe procesar el mensaje basado en el nombre del canal.
-        if channel_name.startswith('attack-'): target_cog_name = 'Ataque'
-        elif channel_name.startswith('defenses-'): target_cog_name = 'Defensa'
-        elif channel_name.startswith('tempo-'): target_cog_name = 'Tempo'
-        elif channel_name.startswith('interserver-'): target_cog_name = 'Interserver'
-        elif message.channel.id == KOTH_CHANNEL_ID: target_cog_name = 'Koth'
+
+        # Determina qué Cog debe procesar el mensaje según la clasificación del canal.
+        channel_info = self.bot.channel_map.get(message.channel)
+        target_cog_name = KIND_COGS[channel_info.kind] if channel_info else None
         
         if not target_cog_name:
             return await interaction.followup.send("❌ Este comando solo se puede usar en un canal de evento válido.")
@@ -134,7 +300,7 @@ class Admin(commands.Cog):
         cog_to_run = self.bot.get_cog(target_cog_name)
         if cog_to_run and hasattr(cog_to_run, 'process_submission'):
             # Llama a la función process_submission del Cog correspondiente.
-            if await cog_to_run.process_submission(message):
+            if await cog_to_run.process_submission(message, channel_info):
                 await interaction.followup.send(f"✅ El envío en `#{message.channel.name}` ha sido añadido a la cola de pendientes.")
             else:
                 await interaction.followup.send("❌ No se pudo procesar el envío. Puede que ya estuviera procesado o que no sea válido (¿es una imagen con menciones?).")
@@ -144,7 +310,7 @@ class Admin(commands.Cog):
     # --- Manejador de errores ---
     async def cog_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
         # CORRECCIÓN: Añadido `commands.NotOwner` para manejar el error del decorador.
-        if isinstance(error, (app_commands.MissingRole, commands.NotOwner)):
+        if isinstance(error, (app_commands.CheckFailure, commands.NotOwner)):
             await interaction.response.send_message("❌ No tienes los permisos necesarios para esta acción.", ephemeral=True)
         else:
             if not interaction.response.is_done():
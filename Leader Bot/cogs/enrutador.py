@@ -0,0 +1,114 @@
+# cogs/enrutador.py
+import discord
+from discord.ext import commands
+import asyncio
+import contextlib
+import os
+import time
+from utils.channels import KIND_COGS
+
+# --- CONFIGURACIÓN ---
+ADMIN_ROLE_ID = int(os.getenv("ADMIN_ROLE_ID", 0))
+
+# --- Emojis de revisión ---
+APPROVE_EMOJI = '✅'
+DENY_EMOJI = '❌'
+REVIEW_EMOJIS = {APPROVE_EMOJI, DENY_EMOJI}
+
+class Enrutador(commands.Cog):
+    """
+    Punto único de entrada para mensajes y reacciones.
+    - Mensajes: el mapa de canales clasificados (utils/channels.py) decide en una búsqueda
+      qué cog debe procesar el mensaje, y la marca del canal (utils/marks.py) avanza tras procesarlo.
+    - Reacciones: el índice message_id -> tipo del almacén de envíos (pendientes y juzgados recientes)
+      entrega cada reacción de revisión a exactamente un cog; para envíos más antiguos el tipo sale
+      del canal, y el cog comprueba en disco si el mensaje es un envío.
+    Al pasar todo por aquí, la latencia de cada cog se mide aquí (bot.metrics).
+    """
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.submissions = bot.submissions
+        self.channel_map = bot.channel_map
+        # message_id -> [Lock, usuarios]: las revisiones de un mismo mensaje se procesan de una en una.
+        self._review_locks = {}
+
+    async def cog_load(self):
+        await self.bot.submissions.ready()
+        await self.bot.channel_marks.load()
+
+    # --- MENSAJES ---
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if message.author.bot or message.guild is None:
+            return
+        channel_info = self.channel_map.get(message.channel)
+        if channel_info is None:
+            return
+        cog = self.bot.get_cog(KIND_COGS[channel_info.kind])
+        if cog:
+            started = time.perf_counter()
+            await cog.process_submission(message, channel_info)
+            self.bot.metrics.observe_handler('on_message', cog.qualified_name, time.perf_counter() - started)
+        # Marca de agua del canal: tras una caída se reprocesa desde aquí (ver Admin.catch_up).
+        self.bot.channel_marks.advance(message.guild.id, message.channel.id, message.id)
+
+    # --- Invalidación del mapa de canales ---
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        self.channel_map.invalidate(channel.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        self.channel_map.invalidate(after.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        self.channel_map.invalidate(channel.id)
+
+    # --- REACCIONES ---
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        if str(payload.emoji) not in REVIEW_EMOJIS:
+            return
+        member = payload.member
+        if member is None or member.bot or not any(role.id == ADMIN_ROLE_ID for role in member.roles):
+            return
+
+        kind = self.submissions.kind_of(payload.message_id)
+        if kind is None:
+            # Fuera del índice (envío antiguo o mensaje normal): el tipo lo da la clasificación del canal.
+            channel = self.bot.get_channel(payload.channel_id)
+            channel_info = self.channel_map.get(channel) if channel else None
+            if channel_info is None:
+                return
+            kind = channel_info.kind
+
+        cog = self.bot.get_cog(KIND_COGS[kind])
+        if cog:
+            started = time.perf_counter()
+            async with self._review_lock(payload.message_id):
+                await cog.handle_reaction(payload)
+            self.bot.metrics.observe_handler('on_raw_reaction_add', cog.qualified_name, time.perf_counter() - started)
+
+    @contextlib.asynccontextmanager
+    async def _review_lock(self, message_id: int):
+        """
+        Serializa las revisiones de un mensaje. `handle_reaction` espera a que los puntos se escriban
+        (ver Puntos.award_points) antes de guardar la decisión: sin esto, dos ✅ casi simultáneos
+        sobre un envío rechazado otorgarían los puntos dos veces, y un cambio de decisión durante
+        la espera no encontraría el envío ni en pendientes ni en juzgados.
+        """
+        entry = self._review_locks.get(message_id)
+        if entry is None:
+            entry = self._review_locks[message_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._review_locks[message_id]
+
+async def setup(bot):
+    await bot.add_cog(Enrutador(bot))
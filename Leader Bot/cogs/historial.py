@@ -0,0 +1,129 @@
+# cogs/historial.py
+import discord
+from discord import app_commands
+from discord.ext import commands
+import traceback
+from utils.archive import SeasonArchive
+
+# --- CONFIGURACIÓN ---
+HISTORY_PAGE_SIZE = 15 # Filas por página en /historial total.
+
+@app_commands.guild_only()
+class Historial(commands.GroupCog, name="historial", description="Estadísticas de todas las temporadas, incluidas las archivadas."):
+    """
+    Consultas entre temporadas: la temporada en curso (y las terminadas aún sin archivar) se leen
+    de la base de datos en uso; las archivadas, de sus archivos season-N-leaderboard.db (utils/archive.py).
+    """
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        super().__init__()
+        self.archive = SeasonArchive()
+
+    async def cog_unload(self):
+        self.archive.close()
+
+    async def seasons_for(self, guild_id: int):
+        """season_id -> {user_id: puntos} de todas las temporadas conocidas del servidor, en orden."""
+        rows = await self.bot.db.fetchall(
+            "SELECT season_id, user_id, points FROM totals WHERE guild_id = ? AND points != 0",
+            (guild_id,), label='history_live_totals')
+        live = {}
+        for season_id, user_id, points in rows:
+            live.setdefault(season_id, {})[user_id] = points
+
+        seasons = {}
+        for season_id, path in self.archive.discover().items():
+            # Una temporada recién terminada puede estar a la vez en su archivo y en la base de datos
+            # (entre la copia y la limpieza): manda la base de datos.
+            if season_id not in live:
+                seasons[season_id] = await self.archive.season_totals(season_id, path, guild_id)
+        seasons.update(live)
+        return {season_id: totals for season_id, totals in sorted(seasons.items()) if totals}
+
+    def _season_label(self, season_id: int) -> str:
+        return f"T{season_id}" + (" (en curso)" if season_id == self.bot.seasons.current else "")
+
+    @staticmethod
+    def _rank_of(totals: dict, user_id: int):
+        """Posición de `user_id` en una temporada con el mismo orden que /rank, o None si no puntuó."""
+        points = totals.get(user_id)
+        if points is None:
+            return None
+        return 1 + sum(1 for other, other_points in totals.items()
+                       if other_points > points or (other_points == points and other < user_id))
+
+    # --- COMANDOS ---
+    @app_commands.command(name="total", description="Ranking histórico sumando todas las temporadas.")
+    @app_commands.describe(pagina="Página del ranking (15 jugadores por página).")
+    async def all_time(self, interaction: discord.Interaction, pagina: app_commands.Range[int, 1] = 1):
+        await interaction.response.defer()
+        seasons = await self.seasons_for(interaction.guild.id)
+        if not seasons:
+            return await interaction.followup.send("No hay puntos registrados en ninguna temporada.")
+
+        all_time, played = {}, {}
+        for totals in seasons.values():
+            for user_id, points in totals.items():
+                all_time[user_id] = all_time.get(user_id, 0) + points
+                played[user_id] = played.get(user_id, 0) + 1
+        ranking = sorted(((points, user_id) for user_id, points in all_time.items() if points), key=lambda r: (-r[0], r[1]))
+
+        total_pages = max(1, -(-len(ranking) // HISTORY_PAGE_SIZE))
+        pagina = min(pagina, total_pages)
+        first = (pagina - 1) * HISTORY_PAGE_SIZE
+        page = ranking[first:first + HISTORY_PAGE_SIZE]
+        names = await self.bot.names.resolve_many(interaction.guild, [user_id for _, user_id in page])
+
+        lines = []
+        for i, (points, user_id) in enumerate(page, start=first + 1):
+            name = names.get(user_id)
+            label = f"**{name}**" if name else f"`Usuario Desconocido ({user_id})`"
+            lines.append(f"**{i}.** {label} - `{points}` puntos · {played[user_id]} temporada(s)")
+
+        embed = discord.Embed(title="📜 Ranking Histórico", description="\n".join(lines), color=discord.Color.gold())
+        embed.set_footer(text=f"Página {pagina} de {total_pages} · {len(ranking)} jugadores · temporadas {', '.join(f'T{s}' for s in seasons)}")
+        await interaction.followup.send(embed=embed)
+
+    @app_commands.command(name="comparar", description="Compara los puntos y la posición de dos jugadores temporada a temporada.")
+    @app_commands.describe(jugador="Jugador a consultar.", rival="Jugador con el que compararlo (opcional).")
+    async def compare(self, interaction: discord.Interaction, jugador: discord.Member, rival: discord.Member = None):
+        await interaction.response.defer()
+        seasons = await self.seasons_for(interaction.guild.id)
+        players = [jugador] if rival is None or rival.id == jugador.id else [jugador, rival]
+
+        lines, sums = [], {player.id: 0 for player in players}
+        for season_id, totals in seasons.items():
+            if not any(player.id in totals for player in players):
+                continue
+            cells = []
+            for player in players:
+                points = totals.get(player.id, 0)
+                sums[player.id] += points
+                rank = self._rank_of(totals, player.id)
+                cells.append(f"`{points}` ({f'#{rank}' if rank else '—'})")
+            lines.append(f"**{self._season_label(season_id)}:** " + " vs ".join(cells))
+
+        if not lines:
+            return await interaction.followup.send("No hay puntos registrados para esos jugadores en ninguna temporada.")
+
+        title = " vs ".join(player.display_name for player in players)
+        embed = discord.Embed(title=f"📊 {title}", description="\n".join(lines), color=discord.Color.blue())
+        embed.add_field(name="Total", value=" vs ".join(f"`{sums[player.id]}`" for player in players), inline=False)
+        if len(players) == 2:
+            a, b = players
+            won = sum(1 for totals in seasons.values() if totals.get(a.id, 0) > totals.get(b.id, 0))
+            lost = sum(1 for totals in seasons.values() if totals.get(b.id, 0) > totals.get(a.id, 0))
+            embed.set_footer(text=f"Temporadas por delante: {a.display_name} {won} · {b.display_name} {lost}")
+        await interaction.followup.send(embed=embed)
+
+    # --- MANEJO DE ERRORES ---
+    async def cog_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        if not interaction.response.is_done():
+            await interaction.response.send_message("Ocurrió un error inesperado.", ephemeral=True)
+        else:
+            await interaction.followup.send("Ocurrió un error inesperado.", ephemeral=True)
+        print(f"Error en un comando de Historial por {interaction.user}: {error}")
+        traceback.print_exc()
+
+async def setup(bot):
+    await bot.add_cog(Historial(bot))
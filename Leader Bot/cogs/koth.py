@@ -2,24 +2,22 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import json
-import re
 import traceback
 import os
 from datetime import datetime, timezone
+from utils.channels import ChannelInfo
+from utils.parser import parse_submission
+from utils.state import load_json_async, save_json
 
 # --- CONFIGURACIÓN ---
 KOTH_CHANNEL_ID = int(os.getenv("KOTH_CHANNEL_ID", 0))
 ADMIN_ROLE_ID = int(os.getenv("ADMIN_ROLE_ID", 0))
-BOT_AUDIT_LOGS_CHANNEL_ID = int(os.getenv("BOT_AUDIT_LOGS_CHANNEL_ID", 0))
 
 # --- Emojis y Archivos de Datos ---
 PENDING_EMOJI = '📝'
 APPROVE_EMOJI = '✅'
 DENY_EMOJI = '❌'
 KOTH_EVENT_FILE = 'koth_event.json'
-PENDING_KOTH_FILE = 'pending_koth.json'
-JUDGED_KOTH_FILE = 'judged_koth.json'
 
 # --- Clase del Cog ---
 @app_commands.guild_only()
@@ -27,63 +25,53 @@ class Koth(commands.GroupCog, name="koth", description="Comandos para gestionar
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         super().__init__()
-        self.pending_koth = self.load_data(PENDING_KOTH_FILE)
-        self.judged_koth = self.load_data(JUDGED_KOTH_FILE)
-        self.koth_event = self.load_koth_event()
+        self.pending_koth = {}
+        self.judged_koth = {}
+        self.koth_event = {'active': False, 'name': None, 'points_per_tag': 0}
+
+    async def cog_load(self):
+        """Carga el evento activo y los envíos pendientes y juzgados desde la tabla `submissions`."""
+        self.koth_event = await self.load_koth_event()
+        self.pending_koth, self.judged_koth = await self.bot.submissions.load('koth')
 
     # --- Métodos de gestión de datos ---
-    def load_data(self, filename):
-        try:
-            with open(filename, 'r') as f: return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError): return {}
-
-    def save_data(self, data, filename):
-        with open(filename, 'w') as f: json.dump(data, f, indent=4)
-
-    def load_koth_event(self):
-        try:
-            with open(KOTH_EVENT_FILE, 'r') as f: return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError): return {'active': False, 'name': None, 'points_per_tag': 0}
+    async def load_koth_event(self):
+        return await load_json_async(KOTH_EVENT_FILE, {'active': False, 'name': None, 'points_per_tag': 0})
     
     def save_koth_event(self, data):
-        with open(KOTH_EVENT_FILE, 'w') as f: json.dump(data, f, indent=4)
+        save_json(KOTH_EVENT_FILE, data)
 
     # --- LÓGICA CENTRALIZADA DE PROCESAMIENTO ---
-    async def process_submission(self, message: discord.Message) -> bool:
+    async def process_submission(self, message: discord.Message, channel_info: ChannelInfo = None) -> bool:
         """
         Procesa un mensaje para ver si es un envío de KOTH válido.
         Devuelve True si se procesa, False si no.
         """
         if not self.koth_event.get('active'): return False
+        channel_info = channel_info or self.bot.channel_map.get(message.channel)
+        if channel_info is None or channel_info.kind != 'koth': return False
         if any(reaction.me for reaction in message.reactions): return False
         
-        all_mentions_in_text = re.findall(r'<@!?(\d+)>', message.content)
-        if not message.attachments or not all_mentions_in_text or not any(att.content_type.startswith('image/') for att in message.attachments):
+        parsed = parse_submission(message, channel_info)
+        if parsed is None:
             return False
 
-        self.pending_koth[str(message.id)] = {'allies': all_mentions_in_text}
-        self.save_data(self.pending_koth, PENDING_KOTH_FILE)
+        self.pending_koth[str(message.id)] = parsed.as_submission()
+        await self.bot.submissions.add_pending('koth', message, self.pending_koth[str(message.id)])
         await message.add_reaction(PENDING_EMOJI)
         return True
 
-    # --- LISTENERS ---
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        """Escucha mensajes en el canal de KOTH y los procesa."""
-        if message.author.bot or message.channel.id != KOTH_CHANNEL_ID: return
-        await self.process_submission(message)
-
-    @commands.Cog.listener()
-    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
-        if payload.member.bot or payload.channel_id != KOTH_CHANNEL_ID: return
-        if not any(role.id == ADMIN_ROLE_ID for role in payload.member.roles): return
+    # --- REVISIÓN ---
+    async def handle_reaction(self, payload: discord.RawReactionActionEvent):
+        """Lo invoca el cog Enrutador, que ya comprobó el emoji, el rol de admin y que el mensaje pertenece a este cog."""
+        if payload.channel_id != KOTH_CHANNEL_ID: return
         
         message_id_str = str(payload.message_id)
         emoji = str(payload.emoji)
-        if emoji not in [APPROVE_EMOJI, DENY_EMOJI]: return
         
         is_pending = message_id_str in self.pending_koth
-        is_judged = message_id_str in self.judged_koth
+        judged = None if is_pending else await self.judged_koth.get(message_id_str)
+        is_judged = judged is not None
         if not is_pending and not is_judged: return
 
         puntos_cog = self.bot.get_cog('Puntos')
@@ -92,9 +80,10 @@ class Koth(commands.GroupCog, name="koth", description="Comandos para gestionar
         if is_pending:
             submission = self.pending_koth.pop(message_id_str)
             if emoji == APPROVE_EMOJI:
-                if puntos_cog and points_to_award > 0:
-                    for user_id in submission['allies']:
-                        await puntos_cog.add_points(payload, user_id, points_to_award, 'koth')
+                if puntos_cog and points_to_award > 0 and not await puntos_cog.award_points(payload, submission['allies'], points_to_award, 'koth', submission_id=message_id_str):
+                    # Los puntos no se guardaron: el envío sigue pendiente para poder reintentarlo.
+                    self.pending_koth[message_id_str] = submission
+                    return
                 submission['status'] = 'approved'
                 submission['points'] = points_to_award # Guardamos los puntos para referencia
                 self.judged_koth[message_id_str] = submission
@@ -103,27 +92,24 @@ class Koth(commands.GroupCog, name="koth", description="Comandos para gestionar
                 submission['status'] = 'denied'
                 self.judged_koth[message_id_str] = submission
                 await self.send_log_message(payload, submission, "KOTH", "rechazado")
-            self.save_data(self.pending_koth, PENDING_KOTH_FILE)
-            self.save_data(self.judged_koth, JUDGED_KOTH_FILE)
+            await self.bot.submissions.set_status(message_id_str, submission, payload.user_id)
         
         elif is_judged:
             # Lógica para cambiar una decisión ya tomada
-            submission = self.judged_koth[message_id_str]
+            submission = judged
             old_status = submission['status']
             if emoji == APPROVE_EMOJI and old_status == 'denied':
-                if puntos_cog and points_to_award > 0:
-                    for user_id in submission['allies']:
-                        await puntos_cog.add_points(payload, user_id, points_to_award, 'koth')
+                if puntos_cog and points_to_award > 0 and not await puntos_cog.award_points(payload, submission['allies'], points_to_award, 'koth', submission_id=message_id_str):
+                    return
                 submission['status'] = 'approved'
                 await self.log_decision_change(payload, "KOTH", "APROBADO")
             elif emoji == DENY_EMOJI and old_status == 'approved':
-                if puntos_cog and points_to_award > 0:
-                    for user_id in submission['allies']:
-                        await puntos_cog.add_points(payload, user_id, -points_to_award, 'koth')
+                if puntos_cog and points_to_award > 0 and not await puntos_cog.award_points(payload, submission['allies'], -points_to_award, 'koth', submission_id=message_id_str):
+                    return
                 submission['status'] = 'denied'
                 await self.log_decision_change(payload, "KOTH", "RECHAZADO")
             self.judged_koth[message_id_str] = submission
-            self.save_data(self.judged_koth, JUDGED_KOTH_FILE)
+            await self.bot.submissions.set_status(message_id_str, submission, payload.user_id)
 
     # --- COMANDOS SLASH ---
     @app_commands.command(name="start", description="Inicia un nuevo evento KOTH.")
@@ -166,21 +152,17 @@ class Koth(commands.GroupCog, name="koth", description="Comandos para gestionar
 
     # --- FUNCIONES DE LOGS Y ERRORES ---
     async def send_log_message(self, payload, submission, type_str, action_str):
-        log_channel = self.bot.get_channel(BOT_AUDIT_LOGS_CHANNEL_ID)
-        if not log_channel: return
         message_link = f"https://discord.com/channels/{payload.guild_id}/{payload.channel_id}/{payload.message_id}"
         points = submission.get('points', self.koth_event.get('points_per_tag', 0))
         if action_str == "aprobado":
             unique_ally_mentions = [f"<@{uid}>" for uid in set(submission['allies'])]
-            await log_channel.send(f"{APPROVE_EMOJI} **{type_str}** {action_str} por {payload.member.mention}. [Ir al envío]({message_link})\n> Se han otorgado **`{points}`** puntos por mención a: {', '.join(unique_ally_mentions)}.")
+            self.bot.audit.log(f"{APPROVE_EMOJI} **{type_str}** {action_str} por {payload.member.mention}. [Ir al envío]({message_link})\n> Se han otorgado **`{points}`** puntos por mención a: {', '.join(unique_ally_mentions)}.", color=discord.Color.green())
         else: # Rechazado
-            await log_channel.send(f"{DENY_EMOJI} **{type_str}** {action_str} por {payload.member.mention}. [Ir al envío]({message_link})")
+            self.bot.audit.log(f"{DENY_EMOJI} **{type_str}** {action_str} por {payload.member.mention}. [Ir al envío]({message_link})", color=discord.Color.red())
 
     async def log_decision_change(self, payload, type_str, new_status_str):
-        log_channel = self.bot.get_channel(BOT_AUDIT_LOGS_CHANNEL_ID)
-        if not log_channel: return
         message_link = f"https://discord.com/channels/{payload.guild_id}/{payload.channel_id}/{payload.message_id}"
-        await log_channel.send(f"🔄 Decisión cambiada a **{new_status_str}** por {payload.member.mention} para un envío de **{type_str}**. [Ir al envío]({message_link})")
+        self.bot.audit.log(f"🔄 Decisión cambiada a **{new_status_str}** por {payload.member.mention} para un envío de **{type_str}**. [Ir al envío]({message_link})", color=discord.Color.blue())
 
     async def cog_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
         if isinstance(error, app_commands.MissingRole):
@@ -2,39 +2,134 @@
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
-import sqlite3
-import json
+import asyncio
+from collections import OrderedDict
 from datetime import datetime, timezone
 import os
 import traceback
+from utils.migrations import rebuild_totals as _rebuild_totals_sql
+from utils.seasons import CURRENT_SEASON_SQL
 
 # --- CONFIGURACIÓN ---
 ADMIN_ROLE_ID = int(os.getenv("ADMIN_ROLE_ID"))
-BOT_AUDIT_LOGS_CHANNEL_ID = int(os.getenv("BOT_AUDIT_LOGS_CHANNEL_ID"))
-DB_FILE = 'leaderboard.db'
-SNAPSHOT_FILE = 'ranking_snapshot.json'
+RANK_SNAPSHOT_RETENTION = 30 # Snapshots del ranking que se conservan (uno por día).
+LEDGER_FLUSH_WINDOW = 0.2 # Segundos que se esperan para agrupar otorgamientos de varios envíos en una sola transacción.
+RANK_PAGE_SIZE = 15 # Filas por página en /rank.
+RANK_CACHE_SIZE = 256 # Páginas del ranking ya renderizadas que se guardan (por servidor, página y temporada).
+RANK_CURSOR_CACHE_SIZE = 4096 # Cursores de fin de página que se guardan (sobreviven a la expulsión de la página renderizada).
+
+def _take_rank_snapshot(con):
+    """Guarda la posición actual de cada jugador en cada servidor (temporada en curso) y descarta los snapshots más antiguos."""
+    taken_at = datetime.now(timezone.utc).isoformat()
+    cur = con.execute(f'''
+        INSERT INTO rank_snapshots (guild_id, taken_at, user_id, rank, points, season_id)
+        SELECT guild_id, ?, user_id, ROW_NUMBER() OVER (PARTITION BY guild_id ORDER BY points DESC, user_id ASC), points, season_id
+        FROM totals WHERE points != 0 AND season_id = {CURRENT_SEASON_SQL}
+    ''', (taken_at,))
+    con.execute('''
+        DELETE FROM rank_snapshots WHERE taken_at NOT IN (
+            SELECT DISTINCT taken_at FROM rank_snapshots ORDER BY taken_at DESC LIMIT ?
+        )
+    ''', (RANK_SNAPSHOT_RETENTION,))
+    return cur.rowcount
+
+class RankPage:
+    """Una página del ranking ya renderizada: filas (para la navegación), posición inicial, total y embed."""
+    __slots__ = ('rows', 'first_pos', 'total', 'embed')
+
+    def __init__(self, rows, first_pos: int, total: int, embed: discord.Embed):
+        self.rows = rows
+        self.first_pos = first_pos
+        self.total = total
+        self.embed = embed
+
+# --- VISTA PAGINADA DEL RANKING ---
+class RankingView(discord.ui.View):
+    """
+    Botones de navegación de /rank. Las páginas salen de la caché del cog (ver Puntos._get_rank_page);
+    si no están, las flechas piden la siguiente/anterior con el cursor de la página mostrada.
+    """
+    def __init__(self, cog: 'Puntos', guild: discord.Guild, season_id: int):
+        super().__init__(timeout=300)
+        self.cog = cog
+        self.guild = guild
+        self.season_id = season_id # Fijada al abrir la vista: no cambia de temporada a mitad de la navegación.
+        self.page = 1
+        self.rank_page = None
+        self.message = None
+
+    def set_page(self, rank_page: RankPage) -> discord.Embed:
+        self.page = (rank_page.first_pos - 1) // RANK_PAGE_SIZE + 1
+        self.rank_page = rank_page
+        self.previous_page.disabled = self.page <= 1
+        self.next_page.disabled = rank_page.first_pos + len(rank_page.rows) > rank_page.total
+        return rank_page.embed
+
+    async def _show(self, interaction: discord.Interaction, page: int, **cursor):
+        rank_page = await self.cog._get_rank_page(self.guild, page, self.season_id, **cursor)
+        if rank_page is None:
+            return await interaction.response.defer()
+        await interaction.response.defer()
+        await interaction.edit_original_response(embed=self.set_page(rank_page), view=self)
+
+    @discord.ui.button(emoji="⬅️", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.page <= 2:
+            return await self._show(interaction, 1)
+        user_id, points, _ = self.rank_page.rows[0]
+        await self._show(interaction, self.page - 1, before=(points, user_id))
+
+    @discord.ui.button(emoji="➡️", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        user_id, points, _ = self.rank_page.rows[-1]
+        await self._show(interaction, self.page + 1, after=(points, user_id))
+
+    @discord.ui.button(label="Mi posición", emoji="📍", style=discord.ButtonStyle.primary)
+    async def jump_to_me(self, interaction: discord.Interaction, button: discord.ui.Button):
+        position = await self.cog._rank_position(self.guild.id, interaction.user.id, self.season_id)
+        if position is None:
+            return await interaction.response.send_message("Aún no tienes puntos en el ranking.", ephemeral=True)
+        await self._show(interaction, (position[0] - 1) // RANK_PAGE_SIZE + 1, around_user=interaction.user.id)
+
+    async def on_timeout(self):
+        if self.message:
+            try: await self.message.edit(view=None)
+            except discord.HTTPException: pass
 
 class Puntos(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self._initialize_database()
+        self.db = bot.db
+        self._ledger_queue = asyncio.Queue()
+        self._ledger_task = None
+        # Caché de páginas renderizadas: (guild_id, página, temporada) -> RankPage. Se invalida por
+        # servidor cuando cambia su libro de puntos; `_rank_generation` evita guardar una página
+        # calculada antes de una invalidación que llegó mientras se construía.
+        self._rank_cache = OrderedDict()
+        self._rank_generation = {}
+        # Aparte, y más baratos de guardar: el cursor (points, user_id) de la última fila de cada página
+        # y el total de jugadores, para pedir una página sin rehacer consultas de las anteriores.
+        self._rank_cursors = OrderedDict()
+        self._rank_totals = {}
+        self.rank_cache_hits = 0
+        self.rank_cache_misses = 0
         self.snapshot_ranking_task.start()
 
-    def cog_unload(self):
+    async def cog_load(self):
+        # Las migraciones pendientes se aplican automáticamente al cargar el cog.
+        await self._initialize_database()
+        self._ledger_task = asyncio.create_task(self._ledger_writer())
+
+    async def cog_unload(self):
         self.snapshot_ranking_task.cancel()
+        # Se vacía la cola antes de descargar para no perder puntos ya aceptados.
+        if self._ledger_task:
+            self._ledger_queue.put_nowait(None)
+            await self._ledger_task
 
-    def _initialize_database(self):
+    async def _initialize_database(self):
         try:
-            con = sqlite3.connect(DB_FILE)
-            cur = con.cursor()
-            cur.execute('''
-                CREATE TABLE IF NOT EXISTS puntuaciones (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, guild_id INTEGER NOT NULL,
-                    category TEXT NOT NULL, points INTEGER NOT NULL, timestamp DATETIME NOT NULL
-                )
-            ''')
-            con.commit()
-            con.close()
+            await self.db.migrate()
         except Exception as e:
             print(f"Error al inicializar la base de datos: {e}")
 
@@ -43,78 +138,277 @@ class Puntos(commands.Cog):
         await self.bot.wait_until_ready()
         print(f"[{datetime.now()}] Creando snapshot del ranking...")
         try:
-            con = sqlite3.connect(DB_FILE)
-            cur = con.cursor()
-            cur.execute("SELECT user_id, SUM(points) as total_points FROM puntuaciones GROUP BY user_id")
-            ranking_data = cur.fetchall()
-            con.close()
-            snapshot = {str(row[0]): row[1] for row in ranking_data}
-            with open(SNAPSHOT_FILE, 'w') as f:
-                json.dump(snapshot, f)
-            print("Snapshot del ranking creado exitosamente.")
+            rows = await self.db.run_write(_take_rank_snapshot, label='snapshot_ranking')
+            # Las flechas de subida/bajada cambian para todos.
+            self.invalidate_rankings()
+            print(f"Snapshot del ranking creado exitosamente ({rows} filas).")
         except Exception as e:
             print(f"Error al crear el snapshot del ranking: {e}")
 
-    async def add_points(self, interaction_or_payload, user_id: str, amount: int, category: str):
+    # --- REGISTRO DE PUNTOS (ESCRITURA DIFERIDA POR LOTES) ---
+    async def award_points(self, interaction_or_payload, user_ids, amount: int, category: str, submission_id: str = None) -> bool:
+        """
+        Encola un lote de puntos (un envío completo) y espera a que quede guardado en disco.
+        Los lotes que llegan dentro de la misma ventana se escriben juntos en una única transacción.
+        Devuelve True si el lote se guardó correctamente. Si no, lo avisa en el registro de auditoría
+        y quien llama no debe guardar la decisión (el envío queda como estaba para reintentarlo).
+        """
+        guild_id = interaction_or_payload.guild_id
+        timestamp = datetime.now(timezone.utc)
+        rows = [(int(user_id), guild_id, category, amount, timestamp, submission_id) for user_id in user_ids]
+        if not rows:
+            return True
+
+        done = asyncio.get_running_loop().create_future()
+        self._ledger_queue.put_nowait((submission_id, rows, done))
         try:
-            con = sqlite3.connect(DB_FILE)
-            cur = con.cursor()
-            guild_id = interaction_or_payload.guild_id
-            cur.execute("INSERT INTO puntuaciones (user_id, guild_id, category, points, timestamp) VALUES (?, ?, ?, ?, ?)",
-                        (int(user_id), guild_id, category, amount, datetime.now(timezone.utc)))
-            con.commit()
-            con.close()
-            print(f"Se registraron {amount} puntos para el usuario {user_id} en la categoría '{category}'.")
+            await done
         except Exception as e:
-            print(f"Error al añadir puntos a la base de datos: {e}")
+            print(f"Error al añadir puntos a la base de datos (envío {submission_id}): {e}")
+            self.bot.audit.log(
+                f"⚠️ No se pudieron guardar `{amount}` puntos de **{category}** (envío {submission_id}): {e}\n"
+                f"> La decisión no se ha registrado; quita y vuelve a poner la reacción para reintentarlo.",
+                color=discord.Color.orange())
+            return False
+        print(f"Se registraron {amount} puntos para {len(rows)} usuario(s) en la categoría '{category}' (envío {submission_id}).")
+        return True
 
-    @app_commands.command(name="rank", description="Muestra la tabla de clasificación de puntos completa.")
-    async def show_rank(self, interaction: discord.Interaction):
-        await interaction.response.defer(ephemeral=False)
-        try:
-            with open(SNAPSHOT_FILE, 'r') as f: previous_ranking_snapshot = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError): previous_ranking_snapshot = {}
-        
-        con = sqlite3.connect(DB_FILE)
-        cur = con.cursor()
-        cur.execute("SELECT user_id, SUM(points) as total_points FROM puntuaciones WHERE guild_id = ? GROUP BY user_id HAVING SUM(points) != 0 ORDER BY total_points DESC", (interaction.guild.id,))
-        current_ranking_data = cur.fetchall()
-        con.close()
+    async def add_points(self, interaction_or_payload, user_id: str, amount: int, category: str):
+        """Atajo para otorgar puntos a un único usuario."""
+        return await self.award_points(interaction_or_payload, [user_id], amount, category)
 
-        if not current_ranking_data:
-            await interaction.followup.send("Aún no se ha registrado ningún punto en este servidor.")
+    async def _ledger_writer(self):
+        """Tarea en segundo plano que agrupa los lotes pendientes y los escribe con un solo `executemany`."""
+        while True:
+            first = await self._ledger_queue.get()
+            if first is None:
+                return
+            batch = [first]
+            await asyncio.sleep(LEDGER_FLUSH_WINDOW)
+            stopping = False
+            while not self._ledger_queue.empty():
+                item = self._ledger_queue.get_nowait()
+                if item is None:
+                    stopping = True
+                else:
+                    batch.append(item)
+            await self._flush_ledger(batch)
+            if stopping:
+                return
+
+    async def _flush_ledger(self, batch):
+        rows = [row for _, batch_rows, _ in batch for row in batch_rows]
+        try:
+            # La temporada se resuelve dentro del INSERT: un cambio de temporada nunca deja puntos sin asignar.
+            await self.db.executemany(f"INSERT INTO puntuaciones (user_id, guild_id, category, points, timestamp, submission_id, season_id) VALUES (?, ?, ?, ?, ?, ?, {CURRENT_SEASON_SQL})",
+                                      rows, label='ledger_flush')
+        except Exception as e:
+            for _, _, done in batch:
+                if not done.done(): done.set_exception(e)
             return
+        self.invalidate_rankings({row[1] for row in rows})
+        for _, _, done in batch:
+            if not done.done(): done.set_result(len(rows))
 
-        previous_ranks = {user_id: i for i, (user_id, _) in enumerate(sorted(previous_ranking_snapshot.items(), key=lambda item: item[1], reverse=True))}
-        
-        full_rank_list_text = []
-        for i, (user_id, total_points) in enumerate(current_ranking_data):
-            try:
-                member = await interaction.guild.fetch_member(int(user_id))
-                display_name = member.display_name
-                
-                current_pos = i + 1
-                previous_pos = previous_ranks.get(str(user_id))
-                rank_change_emoji = ""
-                if previous_pos is not None:
-                    if current_pos < previous_pos + 1: rank_change_emoji = "⬆️"
-                    elif current_pos > previous_pos + 1: rank_change_emoji = "⬇️"
-                else: rank_change_emoji = "🆕"
-                
-                full_rank_list_text.append(f"**{current_pos}.** **{display_name}** - `{total_points}` puntos {rank_change_emoji}")
-            except discord.NotFound:
-                full_rank_list_text.append(f"**{current_pos}.** `Usuario Desconocido ({user_id})` - `{total_points}` puntos")
-
-        description_text = "\n".join(full_rank_list_text)
-        if len(description_text) > 4000:
-            description_text = description_text[:4000].rsplit('\n', 1)[0] + "\n\n... y más."
+    def ledger_pending(self) -> int:
+        """Lotes de puntos encolados que aún no se han escrito (métricas)."""
+        return self._ledger_queue.qsize()
+
+    # --- RANKING PAGINADO ---
+    # El orden del ranking es (points DESC, user_id ASC); las páginas se piden por "keyset"
+    # a partir de la última/primera fila mostrada, sin OFFSET, apoyándose en idx_totals_ranking.
+    # Cada fila trae además la posición del último snapshot del servidor para las flechas.
+    # Todas las consultas se limitan a una temporada (por defecto, la actual: self.bot.seasons.current).
+    _RANK_PAGE_SELECT = (
+        "SELECT t.user_id, t.points, s.rank FROM totals t "
+        "LEFT JOIN rank_snapshots s ON s.guild_id = t.guild_id AND s.user_id = t.user_id AND s.season_id = t.season_id "
+        "AND s.taken_at = (SELECT MAX(taken_at) FROM rank_snapshots WHERE guild_id = ? AND season_id = ?) "
+        "WHERE t.guild_id = ? AND t.season_id = ? AND t.points != 0 "
+    )
+
+    def _season(self, season_id):
+        return self.bot.seasons.current if season_id is None else season_id
+
+    async def _fetch_rank_page(self, guild_id: int, after=None, before=None, limit: int = RANK_PAGE_SIZE, season_id: int = None):
+        """Devuelve hasta `limit` filas (user_id, points, posición_anterior) posteriores a `after` o anteriores a `before`."""
+        season_id = self._season(season_id)
+        scope = (guild_id, season_id, guild_id, season_id)
+        if before is not None:
+            points, user_id = before
+            rows = await self.db.fetchall(
+                self._RANK_PAGE_SELECT + "AND (t.points > ? OR (t.points = ? AND t.user_id < ?)) ORDER BY t.points ASC, t.user_id DESC LIMIT ?",
+                (*scope, points, points, user_id, limit), label='rank_page_before')
+            return rows[::-1]
+        if after is not None:
+            points, user_id = after
+            return await self.db.fetchall(
+                self._RANK_PAGE_SELECT + "AND (t.points < ? OR (t.points = ? AND t.user_id > ?)) ORDER BY t.points DESC, t.user_id ASC LIMIT ?",
+                (*scope, points, points, user_id, limit), label='rank_page_after')
+        return await self.db.fetchall(
+            self._RANK_PAGE_SELECT + "ORDER BY t.points DESC, t.user_id ASC LIMIT ?",
+            (*scope, limit), label='rank_page_first')
+
+    async def _page_cursor(self, guild_id: int, page: int, season_id: int = None):
+        """Cursor (points, user_id) de la última fila de la página anterior a `page`, con un solo OFFSET sobre el índice."""
+        row = await self.db.fetchone(
+            "SELECT points, user_id FROM totals WHERE guild_id = ? AND season_id = ? AND points != 0 "
+            "ORDER BY points DESC, user_id ASC LIMIT 1 OFFSET ?",
+            (guild_id, self._season(season_id), (page - 1) * RANK_PAGE_SIZE - 1), label='rank_page_cursor')
+        return tuple(row) if row else None
+
+    async def _count_ranked(self, guild_id: int, season_id: int = None) -> int:
+        row = await self.db.fetchone("SELECT COUNT(*) FROM totals WHERE guild_id = ? AND season_id = ? AND points != 0",
+                                     (guild_id, self._season(season_id)), label='rank_count')
+        return row[0]
+
+    async def _rank_position(self, guild_id: int, user_id: int, season_id: int = None):
+        """Devuelve (posición, puntos) del usuario con una única consulta de conteo, o None si no puntúa."""
+        row = await self.db.fetchone(
+            "SELECT t.points, (SELECT COUNT(*) FROM totals o WHERE o.guild_id = t.guild_id AND o.season_id = t.season_id AND o.points != 0 "
+            "AND (o.points > t.points OR (o.points = t.points AND o.user_id < t.user_id))) "
+            "FROM totals t WHERE t.guild_id = ? AND t.season_id = ? AND t.user_id = ? AND t.points != 0",
+            (guild_id, self._season(season_id), user_id), label='rank_position')
+        if row is None:
+            return None
+        return row[1] + 1, row[0]
+
+    async def _fetch_page_around(self, guild_id: int, user_id: int, season_id: int = None):
+        """Devuelve (filas, primera_posición) de la página que contiene al usuario, o None si no puntúa."""
+        season_id = self._season(season_id)
+        position = await self._rank_position(guild_id, user_id, season_id)
+        if position is None:
+            return None
+        rank, points = position
+        rows_before = (rank - 1) % RANK_PAGE_SIZE
+        cursor = (points, user_id)
+        before = await self._fetch_rank_page(guild_id, before=cursor, limit=rows_before, season_id=season_id) if rows_before else []
+        # El cursor (points, user_id - 1) hace que la página posterior incluya al propio usuario.
+        after = await self._fetch_rank_page(guild_id, after=(points, user_id - 1), limit=RANK_PAGE_SIZE - rows_before, season_id=season_id)
+        return before + after, rank - rows_before
+
+    async def _render_rank_page(self, guild: discord.Guild, rows, first_pos: int, total: int, season_id: int = None) -> discord.Embed:
+        """Construye el embed de una página; solo se resuelven los nombres de las filas visibles."""
+        names = await self.bot.names.resolve_many(guild, [user_id for user_id, _, _ in rows])
+
+        rank_list_text = []
+        for i, (user_id, total_points, previous_pos) in enumerate(rows):
+            current_pos = first_pos + i
+            display_name = names.get(user_id)
+            if display_name is None:
+                rank_list_text.append(f"**{current_pos}.** `Usuario Desconocido ({user_id})` - `{total_points}` puntos")
+                continue
+
+            rank_change_emoji = ""
+            if previous_pos is not None:
+                if current_pos < previous_pos: rank_change_emoji = "⬆️"
+                elif current_pos > previous_pos: rank_change_emoji = "⬇️"
+            else: rank_change_emoji = "🆕"
+
+            rank_list_text.append(f"**{current_pos}.** **{display_name}** - `{total_points}` puntos {rank_change_emoji}")
 
         embed = discord.Embed(
             title="🏆 Ranking de Puntos Completo 🏆",
-            description=description_text or "Nadie ha puntuado aún.",
+            description="\n".join(rank_list_text) or "Nadie ha puntuado aún.",
             color=discord.Color.gold()
         )
-        await interaction.followup.send(embed=embed)
+        total_pages = max(1, -(-total // RANK_PAGE_SIZE))
+        season_text = f"Temporada {season_id} · " if season_id else ""
+        embed.set_footer(text=f"{season_text}Página {(first_pos - 1) // RANK_PAGE_SIZE + 1} de {total_pages} · {total} jugadores")
+        return embed
+
+    # --- CACHÉ DE PÁGINAS RENDERIZADAS ---
+    def invalidate_rankings(self, guild_ids=None):
+        """Descarta las páginas en caché de `guild_ids` (o de todos los servidores si es None)."""
+        if guild_ids is None:
+            guild_ids = {key[0] for key in self._rank_cache} | set(self._rank_generation)
+        for guild_id in guild_ids:
+            self._rank_generation[guild_id] = self._rank_generation.get(guild_id, 0) + 1
+        for cache in (self._rank_cache, self._rank_cursors, self._rank_totals):
+            for key in [key for key in cache if key[0] in guild_ids]:
+                del cache[key]
+
+    async def _ranked_total(self, guild_id: int, season_id: int) -> int:
+        total = self._rank_totals.get((guild_id, season_id))
+        if total is None:
+            total = await self._count_ranked(guild_id, season_id)
+        return total
+
+    async def _get_rank_page(self, guild: discord.Guild, page: int = 1, season_id: int = None,
+                             around_user: int = None, after=None, before=None):
+        """
+        Devuelve la RankPage `page` (1 = primera) del servidor, o None si esa página no existe.
+        Solo se consulta y renderiza esa página: `after`/`before` son el cursor (points, user_id) de la
+        página contigua que ya se está mostrando, `around_user` pide la página de ese usuario y, sin
+        ninguno de ellos, el cursor sale de una única consulta con OFFSET (ver _page_cursor).
+        """
+        season_id = self._season(season_id)
+        key = (guild.id, page, season_id)
+        cached = self._rank_cache.get(key)
+        if cached is not None:
+            self._rank_cache.move_to_end(key)
+            self.rank_cache_hits += 1
+            return cached
+        self.rank_cache_misses += 1
+        generation = self._rank_generation.get(guild.id, 0)
+
+        first_pos = (page - 1) * RANK_PAGE_SIZE + 1
+        if page == 1:
+            rows = await self._fetch_rank_page(guild.id, season_id=season_id)
+            total = await self._ranked_total(guild.id, season_id) if rows else 0
+        elif around_user is not None:
+            around = await self._fetch_page_around(guild.id, around_user, season_id)
+            if around is None:
+                return None
+            rows, first_pos = around
+            # La posición puede haber cambiado desde que se calculó `page`: se guarda en la página real.
+            page = (first_pos - 1) // RANK_PAGE_SIZE + 1
+            key = (guild.id, page, season_id)
+            total = await self._ranked_total(guild.id, season_id)
+        else:
+            if after is None and before is None:
+                after = self._rank_cursors.get((guild.id, page - 1, season_id))
+                if after is None:
+                    after = await self._page_cursor(guild.id, page, season_id)
+                if after is None:
+                    return None
+            rows = await self._fetch_rank_page(guild.id, after=after, before=before, season_id=season_id)
+            total = await self._ranked_total(guild.id, season_id) if rows else 0
+        if not rows:
+            return None
+
+        embed = await self._render_rank_page(guild, rows, first_pos, total, season_id)
+        rank_page = RankPage(rows, first_pos, total, embed)
+        if self._rank_generation.get(guild.id, 0) == generation:
+            self._rank_cache[key] = rank_page
+            while len(self._rank_cache) > RANK_CACHE_SIZE:
+                self._rank_cache.popitem(last=False)
+            last_user_id, last_points, _ = rows[-1]
+            self._rank_cursors[key] = (last_points, last_user_id)
+            while len(self._rank_cursors) > RANK_CURSOR_CACHE_SIZE:
+                self._rank_cursors.popitem(last=False)
+            self._rank_totals[(guild.id, season_id)] = total
+        return rank_page
+
+    async def _build_ranking_embed(self, guild_id: int, page: int = 1, season_id: int = None):
+        """Embed de una página del ranking (por defecto, la primera de la temporada actual), o None si nadie ha puntuado."""
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return None
+        rank_page = await self._get_rank_page(guild, page, season_id)
+        return rank_page.embed.copy() if rank_page else None
+
+    @app_commands.command(name="rank", description="Muestra la tabla de clasificación de puntos completa.")
+    async def show_rank(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=False)
+        season_id = self.bot.seasons.current
+        rank_page = await self._get_rank_page(interaction.guild, 1, season_id)
+        if rank_page is None:
+            await interaction.followup.send("Aún no se ha registrado ningún punto en este servidor.")
+            return
+
+        view = RankingView(self, interaction.guild, season_id)
+        embed = view.set_page(rank_page)
+        view.message = await interaction.followup.send(embed=embed, view=view, wait=True)
 
     @app_commands.command(name="points", description="Añade o resta puntos a un usuario manualmente.")
     @app_commands.describe(usuario="El usuario a modificar.", puntos="La cantidad (negativa para restar).", motivo="La razón del ajuste.")
@@ -124,19 +418,27 @@ class Puntos(commands.Cog):
             
         await self.add_points(interaction, str(usuario.id), puntos, 'manual')
         
-        log_channel = self.bot.get_channel(BOT_AUDIT_LOGS_CHANNEL_ID)
-        if log_channel:
-            embed = discord.Embed(title="⚙️ Ajuste Manual de Puntos", color=discord.Color.blue() if puntos > 0 else discord.Color.dark_red())
-            embed.add_field(name="Administrador", value=interaction.user.mention, inline=True)
-            embed.add_field(name="Usuario Afectado", value=usuario.mention, inline=True)
-            embed.add_field(name="Cantidad", value=f"**{puntos:+}** puntos", inline=True)
-            if motivo != "Ajuste manual":
-                embed.add_field(name="Motivo", value=motivo, inline=False)
-            embed.set_footer(text=f"ID de Usuario: {usuario.id}")
-            embed.timestamp = datetime.now(timezone.utc)
-            await log_channel.send(embed=embed)
+        embed = discord.Embed(title="⚙️ Ajuste Manual de Puntos", color=discord.Color.blue() if puntos > 0 else discord.Color.dark_red())
+        embed.add_field(name="Administrador", value=interaction.user.mention, inline=True)
+        embed.add_field(name="Usuario Afectado", value=usuario.mention, inline=True)
+        embed.add_field(name="Cantidad", value=f"**{puntos:+}** puntos", inline=True)
+        if motivo != "Ajuste manual":
+            embed.add_field(name="Motivo", value=motivo, inline=False)
+        embed.set_footer(text=f"ID de Usuario: {usuario.id}")
+        embed.timestamp = datetime.now(timezone.utc)
+        self.bot.audit.log_embed(embed)
             
         await interaction.response.send_message(f"✅ Se han ajustado los puntos de {usuario.mention} en {puntos:+} puntos.", ephemeral=True)
 
+    @app_commands.command(name="rebuild_totals", description="Recalcula la tabla de totales a partir del historial de puntos.")
+    async def rebuild_totals(self, interaction: discord.Interaction):
+        if not any(role.id == ADMIN_ROLE_ID for role in interaction.user.roles):
+            return await interaction.response.send_message("❌ No tienes el rol de administrador necesario.", ephemeral=True)
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        rows = await self.db.run_write(_rebuild_totals_sql, label='rebuild_totals')
+        self.invalidate_rankings()
+        await interaction.followup.send(f"✅ Tabla de totales reconstruida: **{rows}** filas.")
+
 async def setup(bot):
     await bot.add_cog(Puntos(bot))
\ No newline at end of file
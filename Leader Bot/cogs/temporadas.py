@@ -2,12 +2,12 @@
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
-import json
+import asyncio
 import os
 import re
 from datetime import datetime, timedelta, timezone
 import traceback
-import sqlite3
+from utils.state import load_json, load_json_async, save_json
 
 # --- CONFIGURACIÓN ---
 # Carga de IDs desde el archivo .env para mantener la configuración centralizada y segura.
@@ -17,23 +17,18 @@ SEASONS_CATEGORY_ID = int(os.getenv("SEASONS_CATEGORY_ID", 0))
 TEST_GUILD_ID = int(os.getenv("TEST_GUILD_ID", 0))
 
 # --- CONSTANTES DE ARCHIVOS ---
-DB_FILE = 'leaderboard.db'
 SEASON_STATUS_FILE = 'season_status.json'
+DEFAULT_SEASON_STATUS = {'active': False, 'name': None, 'end_time': None, 'channel_id': None, 'season_number': 0}
 
 # --- FUNCIONES DE AYUDA PARA GESTIÓN DE ESTADO ---
 def load_season_data():
     """Carga el estado de la temporada desde un archivo JSON. Si no existe, devuelve un estado por defecto."""
-    try:
-        with open(SEASON_STATUS_FILE, 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        # Estado inicial si no hay temporada o el archivo está corrupto.
-        return {'active': False, 'name': None, 'end_time': None, 'channel_id': None, 'season_number': 0}
+    # Estado inicial si no hay temporada o el archivo (y su copia .bak) está corrupto.
+    return load_json(SEASON_STATUS_FILE, DEFAULT_SEASON_STATUS)
 
 def save_season_data(data):
     """Guarda el estado actual de la temporada en el archivo JSON."""
-    with open(SEASON_STATUS_FILE, 'w') as f:
-        json.dump(data, f, indent=4)
+    save_json(SEASON_STATUS_FILE, data)
 
 # --- COG DE TEMPORADAS ---
 # Usamos un GroupCog para agrupar todos los subcomandos bajo /season (ej. /season start)
@@ -45,6 +40,17 @@ class Temporadas(commands.GroupCog, name="season", description="Comandos para ge
         # Inicia la tarea en segundo plano al cargar el Cog.
         self.check_season_end.start()
 
+    async def cog_load(self):
+        """
+        Sincroniza la temporada de la base de datos con season_status.json: los puntos van a la
+        temporada activa o, si no hay ninguna, a la siguiente. Retoma archivados interrumpidos.
+        """
+        status = await load_json_async(SEASON_STATUS_FILE, DEFAULT_SEASON_STATUS)
+        season_number = status.get('season_number', 0)
+        await self.bot.seasons.load(season_number if status.get('active') else season_number + 1)
+        for season_id in await self.bot.seasons.pending_archives():
+            asyncio.create_task(self._archive_season(season_id))
+
     def cog_unload(self):
         """Se llama automáticamente cuando el Cog se descarga, asegurando que la tarea se detenga limpiamente."""
         self.check_season_end.cancel()
@@ -96,21 +102,33 @@ class Temporadas(commands.GroupCog, name="season", description="Comandos para ge
             else:
                 await final_channel.send("No se registraron puntos en esta temporada.")
 
-        # Archiva la base de datos de la temporada y resetea el estado.
-        season_number = status.get('season_number', 'X')
-        archive_db_name = f'season-{season_number}-leaderboard.db'
-        if os.path.exists(DB_FILE):
-            os.rename(DB_FILE, archive_db_name)
-            if final_channel:
-                await final_channel.send(f"La base de datos de puntos ha sido archivada como `{archive_db_name}`.")
-        
-        # Resetea la base de datos para la nueva temporada.
-        if puntos_cog:
-            puntos_cog._initialize_database()
+        # Cierra la temporada: solo cambia la temporada actual en la base de datos. Los puntos que se
+        # otorguen a partir de aquí (incluidos los que están en cola) van ya a la siguiente temporada.
+        season_number = status.get('season_number', 0)
+        await self.bot.seasons.end(season_number)
         
         # Actualiza el estado a inactivo.
         save_season_data({"active": False, "name": None, "end_time": None, "season_number": season_number, "channel_id": None})
 
+        # El archivo season-N-leaderboard.db se genera en segundo plano (copia en caliente de SQLite).
+        asyncio.create_task(self._archive_season(season_number, final_channel))
+
+    async def _archive_season(self, season_id: int, channel: discord.abc.Messageable = None):
+        try:
+            archive_path, rows = await self.bot.seasons.archive_in_background(season_id)
+        except Exception as e:
+            print(f"Error al archivar la temporada {season_id}: {e}")
+            if channel:
+                await channel.send(f"⚠️ No se pudo archivar la temporada {season_id}: {e}")
+            return
+        print(f"Temporada {season_id} archivada en {archive_path} ({rows} registros).")
+        # La temporada ya no está en la base de datos en uso: sus páginas del ranking en caché tampoco valen.
+        puntos_cog = self.bot.get_cog('Puntos')
+        if puntos_cog:
+            puntos_cog.invalidate_rankings()
+        if channel:
+            await channel.send(f"La base de datos de puntos ha sido archivada como `{archive_path}`.")
+
     # --- COMANDOS ---
     @app_commands.command(name="start", description="Inicia una nueva temporada.")
     @app_commands.describe(nombre="El nombre para esta nueva temporada.", duracion="Duración (ej: 30d, 4w, 12h).")
@@ -145,6 +163,7 @@ class Temporadas(commands.GroupCog, name="season", description="Comandos para ge
             'channel_id': None # Aquí iría new_channel.id
         }
         save_season_data(new_status)
+        await self.bot.seasons.start(new_season_number, nombre)
 
         embed = discord.Embed(title=f"✨ ¡Nueva Temporada Iniciada: {nombre}! ✨", color=discord.Color.brand_green())
         embed.add_field(name="Inicio", value=discord.utils.format_dt(start_date, 'F'), inline=False)
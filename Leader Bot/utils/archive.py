@@ -0,0 +1,88 @@
+# utils/archive.py
+# Consultas de solo lectura sobre las temporadas archivadas (season-N-leaderboard.db).
+import asyncio
+import glob
+import os
+import re
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# --- CONFIGURACIÓN ---
+ARCHIVE_GLOB = 'season-*-leaderboard.db'
+ARCHIVE_RE = re.compile(r'season-(\d+)-leaderboard\.db$')
+ARCHIVE_ATTACH_LIMIT = 4 # Archivos adjuntos a la vez (SQLite admite 10 por conexión).
+
+class SeasonArchive:
+    """
+    Una conexión en memoria a la que se adjuntan (ATTACH, modo solo lectura) los archivos de
+    temporada según se necesitan, como mucho ARCHIVE_ATTACH_LIMIT a la vez (se suelta el menos
+    usado). Los agregados por temporada y servidor se guardan en caché indefinidamente: una
+    temporada archivada ya no cambia (la clave incluye la fecha de modificación del archivo por si
+    se sustituyera a mano).
+    """
+    def __init__(self, directory: str = '.', max_attached: int = ARCHIVE_ATTACH_LIMIT):
+        self.directory = directory
+        self.max_attached = max_attached
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='season-archive')
+        self._con = None
+        self._attached = OrderedDict()  # ruta -> alias
+        self._aliases = 0
+        self._cache = {}                # (ruta, mtime, guild_id) -> {user_id: puntos}
+        self.hits = 0
+        self.misses = 0
+
+    def discover(self):
+        """season_id -> ruta de todos los archivos de temporada del directorio."""
+        found = {}
+        for path in glob.glob(os.path.join(self.directory, ARCHIVE_GLOB)):
+            match = ARCHIVE_RE.search(os.path.basename(path))
+            if match:
+                found[int(match.group(1))] = path
+        return dict(sorted(found.items()))
+
+    async def season_totals(self, season_id: int, path: str, guild_id: int):
+        """{user_id: puntos} de una temporada archivada en un servidor (desde caché si ya se consultó)."""
+        key = (path, os.path.getmtime(path), guild_id)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        totals = await asyncio.get_running_loop().run_in_executor(self._executor, self._query_totals, path, guild_id)
+        self._cache[key] = totals
+        return totals
+
+    def close(self):
+        if self._con is not None:
+            self._con.close()
+            self._con = None
+        self._executor.shutdown(wait=False)
+
+    # --- Dentro del hilo del archivo ---
+    def _alias_for(self, path: str) -> str:
+        if self._con is None:
+            # Conexión URI para poder adjuntar los archivos con ?mode=ro.
+            self._con = sqlite3.connect('file::memory:', uri=True, check_same_thread=False)
+        alias = self._attached.get(path)
+        if alias is not None:
+            self._attached.move_to_end(path)
+            return alias
+        while len(self._attached) >= self.max_attached:
+            _, oldest = self._attached.popitem(last=False)
+            self._con.execute(f"DETACH DATABASE {oldest}")
+        self._aliases += 1
+        alias = f"season_{self._aliases}"
+        uri = f"file:{os.path.abspath(path)}?mode=ro"
+        self._con.execute("ATTACH DATABASE ? AS " + alias, (uri,))
+        self._attached[path] = alias
+        return alias
+
+    def _query_totals(self, path: str, guild_id: int):
+        # Se suma el libro de puntos en lugar de leer `totals`: los archivos anteriores a las
+        # migraciones no tienen esa tabla, y cada archivo contiene una sola temporada.
+        alias = self._alias_for(path)
+        rows = self._con.execute(
+            f"SELECT user_id, SUM(points) FROM {alias}.puntuaciones WHERE guild_id = ? GROUP BY user_id",
+            (guild_id,)).fetchall()
+        return {user_id: points for user_id, points in rows if points}
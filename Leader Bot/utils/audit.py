@@ -0,0 +1,152 @@
+# utils/audit.py
+# Registro de auditoría agrupado: las entradas se encolan y se envían en mensajes de varios embeds.
+import asyncio
+import os
+import discord
+from utils.state import load_json_async, state_writer
+
+# --- CONFIGURACIÓN ---
+BOT_AUDIT_LOGS_CHANNEL_ID = int(os.getenv("BOT_AUDIT_LOGS_CHANNEL_ID", 0))
+AUDIT_SPILL_FILE = 'audit_spill.json'  # Entradas aún no enviadas; sobreviven a un reinicio.
+AUDIT_FLUSH_INTERVAL = 2.0             # Segundos que se esperan para agrupar una ráfaga.
+EMBEDS_PER_MESSAGE = 10                # Límite de Discord por mensaje.
+EMBED_CHARS_PER_MESSAGE = 6000         # Límite de Discord de caracteres sumando todos los embeds.
+AUDIT_MAX_PENDING = 500                # Entradas sin enviar que se conservan como máximo (se descartan las más antiguas).
+
+class AuditLog:
+    """
+    `log()` y `log_embed()` solo encolan (nunca esperan a Discord). Un worker envía la cola cada
+    AUDIT_FLUSH_INTERVAL segundos empaquetando hasta EMBEDS_PER_MESSAGE embeds por mensaje.
+    La cola (como mucho AUDIT_MAX_PENDING entradas) se guarda en AUDIT_SPILL_FILE en cada vuelta
+    del worker, no en cada entrada, y se retoma al arrancar. Sin canal configurado no se encola nada.
+    """
+    def __init__(self, bot, channel_id: int = BOT_AUDIT_LOGS_CHANNEL_ID, path: str = AUDIT_SPILL_FILE):
+        self.bot = bot
+        self.channel_id = channel_id
+        self.path = path
+        self._entries = []  # dicts de embed (Embed.to_dict()); lo pendiente del archivo se añade en `restore()`
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.sent_messages = 0
+        self.sent_entries = 0
+        self.dropped = 0
+
+    def log(self, text: str, color: discord.Color = None):
+        """Encola una entrada de texto (se envía como la descripción de un embed)."""
+        embed = discord.Embed(description=text, color=color)
+        embed.timestamp = discord.utils.utcnow()
+        self.log_embed(embed)
+
+    def log_embed(self, embed: discord.Embed):
+        if not self.channel_id:
+            return
+        self._entries.append(embed.to_dict())
+        self._trim()
+        self._wakeup.set()
+        self.start()
+
+    def _trim(self):
+        excess = len(self._entries) - AUDIT_MAX_PENDING
+        if excess > 0:
+            del self._entries[:excess]
+            self.dropped += excess
+
+    def _requeue(self, batch):
+        self._entries[:0] = batch
+        self._trim()
+
+    def _spill(self):
+        state_writer.save(self.path, self._entries)
+
+    async def restore(self):
+        """Recupera (fuera del event loop) lo que quedó sin enviar en la ejecución anterior y arranca el worker."""
+        if not self.channel_id:
+            return
+        spilled = await load_json_async(self.path, [])
+        if spilled:
+            self._entries[:0] = spilled
+            self._trim()
+            self._spill()
+        self.start()
+
+    def start(self):
+        """Arranca el worker (idempotente)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._worker())
+
+    def pending(self) -> int:
+        return len(self._entries)
+
+    async def close(self):
+        """Detiene el worker e intenta un último envío. Lo que no salga queda en el archivo de respaldo."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._entries:
+            try:
+                await asyncio.wait_for(self.flush(), timeout=5)
+            except (asyncio.TimeoutError, discord.HTTPException):
+                pass
+        if self.channel_id:
+            self._spill()
+
+    async def flush(self):
+        """Envía todo lo encolado. Si el canal no está disponible, las entradas se quedan en la cola."""
+        channel = self.bot.get_channel(self.channel_id)
+        if channel is None:
+            if self.bot.is_ready() and self._entries:
+                # Con el bot listo, un canal que no aparece no va a aparecer: se descarta la cola.
+                print(f"Canal de auditoría {self.channel_id} no encontrado: se descartan {len(self._entries)} entradas.")
+                self.dropped += len(self._entries)
+                self._entries.clear()
+            return
+        while self._entries:
+            # El lote sale de la cola antes del envío: así `_trim()` (llamado desde `log()` mientras se
+            # espera a Discord) solo puede descartar entradas que no están en vuelo.
+            batch = self._next_batch()
+            del self._entries[:len(batch)]
+            try:
+                await channel.send(embeds=[discord.Embed.from_dict(data) for data in batch])
+            except discord.HTTPException as e:
+                if e.status != 400:
+                    self._requeue(batch)
+                    raise
+                # Discord rechaza el contenido (p. ej. un embed demasiado largo): reintentarlo no serviría.
+                print(f"Se descartan {len(batch)} entradas de auditoría rechazadas por Discord: {e}")
+            except BaseException:
+                # Cancelación (p. ej. el límite de tiempo de `close()`) o error inesperado: el lote vuelve a la cola.
+                self._requeue(batch)
+                raise
+            self.sent_messages += 1
+            self.sent_entries += len(batch)
+
+    def _next_batch(self):
+        batch, chars = [], 0
+        for data in self._entries[:EMBEDS_PER_MESSAGE]:
+            size = len(discord.Embed.from_dict(data))
+            if batch and chars + size > EMBED_CHARS_PER_MESSAGE:
+                break
+            batch.append(data)
+            chars += size
+        return batch
+
+    async def _worker(self):
+        # Al arrancar puede haber entradas recuperadas del archivo de respaldo.
+        if self._entries:
+            self._wakeup.set()
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(AUDIT_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except discord.HTTPException as e:
+                print(f"No se pudo enviar el registro de auditoría ({len(self._entries)} pendientes): {e}")
+            except Exception as e:
+                print(f"Error inesperado enviando el registro de auditoría: {e}")
+            # Una escritura del respaldo por vuelta, con lo que quede sin enviar.
+            self._spill()
+            if self._entries:
+                # Quedan entradas (canal aún no disponible o error): se reintenta en la siguiente vuelta.
+                self._wakeup.set()
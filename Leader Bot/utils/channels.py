@@ -0,0 +1,74 @@
+# utils/channels.py
+# Clasificación de canales de envíos, calculada una vez por canal y guardada en caché.
+import os
+import re
+
+# --- CONFIGURACIÓN ---
+KOTH_CHANNEL_ID = int(os.getenv("KOTH_CHANNEL_ID", 0))
+
+# Tipo de envío (columna `kind` de la tabla submissions) -> nombre del Cog que lo gestiona.
+KIND_COGS = {
+    'ataque': 'Ataque',
+    'defensa': 'Defensa',
+    'tempo': 'Tempo',
+    'interserver': 'Interserver',
+    'koth': 'Koth',
+}
+
+# Prefijo del nombre del canal -> tipo de envío.
+CHANNEL_PREFIXES = (
+    ('attack-', 'ataque'),
+    ('defenses-', 'defensa'),
+    ('tempo-', 'tempo'),
+    ('interserver-', 'interserver'),
+)
+
+ENEMY_COUNT_RE = re.compile(r'vs(\d+)')
+
+class ChannelInfo:
+    """
+    Lo que un canal aporta a un envío: su tipo y, según el tipo, el número de enemigos
+    (ataque/defensa) o la clave de la tabla de puntos (tramo de tempo / nivel de interserver).
+    """
+    __slots__ = ('kind', 'enemies', 'key')
+
+    def __init__(self, kind: str, enemies: int = 0, key: str = None):
+        self.kind = kind
+        self.enemies = enemies
+        self.key = key
+
+    def __repr__(self):
+        return f"ChannelInfo(kind={self.kind!r}, enemies={self.enemies}, key={self.key!r})"
+
+def classify_channel(channel_id: int, channel_name: str):
+    """Devuelve el ChannelInfo de un canal, o None si no es un canal de envíos."""
+    if channel_id == KOTH_CHANNEL_ID:
+        return ChannelInfo('koth')
+    name = channel_name.lower()
+    for prefix, kind in CHANNEL_PREFIXES:
+        if not name.startswith(prefix):
+            continue
+        if kind in ('ataque', 'defensa'):
+            match = ENEMY_COUNT_RE.search(name)
+            return ChannelInfo(kind, enemies=int(match.group(1)) if match else 0)
+        return ChannelInfo(kind, key=name.split(prefix, 1)[1])
+    return None
+
+class ChannelMap:
+    """Caché channel_id -> ChannelInfo (o None). Se invalida desde los eventos de canal del Enrutador."""
+    def __init__(self):
+        self._cache = {}
+
+    def get(self, channel):
+        try:
+            return self._cache[channel.id]
+        except KeyError:
+            info = classify_channel(channel.id, getattr(channel, 'name', None) or '')
+            self._cache[channel.id] = info
+            return info
+
+    def invalidate(self, channel_id: int):
+        self._cache.pop(channel_id, None)
+
+    def clear(self):
+        self._cache.clear()
@@ -0,0 +1,52 @@
+# utils/command_sync.py
+# Sincronización de comandos de barra solo cuando cambian (hash del payload por destino).
+import hashlib
+import json
+import os
+import time
+from utils.state import load_json, save_json
+
+# --- CONFIGURACIÓN ---
+COMMAND_SYNC_FILE = 'command_sync.json' # destino -> {'hash', 'count', 'seconds', 'synced_at'}
+FORCE_COMMAND_SYNC = os.getenv("FORCE_COMMAND_SYNC", "").lower() in ("1", "true", "yes")
+
+def _target_key(bot, guild) -> str:
+    """Un destino por aplicación y servidor (o global), para no mezclar bots distintos con el mismo archivo."""
+    return f"{bot.application_id}:{guild.id if guild else 'global'}"
+
+def tree_hash(tree, guild=None) -> str:
+    """Hash estable del payload que `tree.sync(guild=...)` enviaría a Discord."""
+    payload = []
+    for command in tree.get_commands(guild=guild):
+        try:
+            payload.append(command.to_dict(tree))
+        except TypeError:
+            # discord.py < 2.4: to_dict() no recibe el árbol.
+            payload.append(command.to_dict())
+    payload.sort(key=lambda c: (c.get('type', 1), c['name']))
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+async def sync_if_changed(bot, guild=None, force: bool = False):
+    """
+    Sincroniza el árbol con `guild` (o globalmente) solo si su hash cambió desde la última vez.
+    Devuelve (comandos sincronizados o None si se omitió, segundos empleados, segundos ahorrados).
+    """
+    started = time.perf_counter()
+    state = load_json(COMMAND_SYNC_FILE, {})
+    key = _target_key(bot, guild)
+    digest = tree_hash(bot.tree, guild)
+    previous = state.get(key)
+    if not (force or FORCE_COMMAND_SYNC) and previous and previous.get('hash') == digest:
+        return None, time.perf_counter() - started, previous.get('seconds', 0.0)
+
+    synced = await bot.tree.sync(guild=guild)
+    elapsed = time.perf_counter() - started
+    state[key] = {
+        'hash': digest,
+        'count': len(synced),
+        'seconds': round(elapsed, 3),
+        'synced_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+    save_json(COMMAND_SYNC_FILE, state)
+    return len(synced), elapsed, 0.0
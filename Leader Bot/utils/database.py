@@ -0,0 +1,158 @@
+# utils/database.py
+# Capa de acceso compartida a SQLite para todos los cogs.
+import asyncio
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.migrations import apply_migrations
+
+# --- CONFIGURACIÓN ---
+READER_CONNECTIONS = 3
+BUSY_TIMEOUT_MS = 5000
+
+class QueryStats:
+    """Contadores de latencia acumulados para una consulta."""
+    __slots__ = ('count', 'total', 'max', 'wait_total')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.wait_total = 0.0
+
+    def record(self, elapsed, waited):
+        self.count += 1
+        self.total += elapsed
+        self.wait_total += waited
+        if elapsed > self.max:
+            self.max = elapsed
+
+class Database:
+    """
+    Servicio de base de datos compartido.
+    Mantiene una única conexión de escritura (en modo WAL) en su propio hilo y un pequeño
+    pool de conexiones de lectura, de modo que ninguna consulta bloquea el event loop.
+    """
+    def __init__(self, path: str, readers: int = READER_CONNECTIONS):
+        self.path = path
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite-writer')
+        self._read_executor = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='sqlite-reader')
+        self._writer = None
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._generation = 0
+        self._migrate_lock = asyncio.Lock()
+        self._migrated = False
+        self.stats = {}
+        # Funciones `observer(label, elapsed, waited)` llamadas tras cada consulta, desde el hilo de SQLite.
+        self.observers = []
+
+    # --- Gestión de conexiones (se ejecuta siempre dentro de los hilos del executor) ---
+    def _connect(self):
+        con = sqlite3.connect(self.path, check_same_thread=False, timeout=BUSY_TIMEOUT_MS / 1000)
+        con.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        con.execute("PRAGMA journal_mode = WAL")
+        con.execute("PRAGMA synchronous = NORMAL")
+        with self._connections_lock:
+            self._connections.append(con)
+        return con
+
+    def _writer_connection(self):
+        if self._writer is None:
+            self._writer = self._connect()
+        return self._writer
+
+    def _reader_connection(self):
+        cached = getattr(self._local, 'connection', None)
+        if cached is None or cached[0] != self._generation:
+            cached = (self._generation, self._connect())
+            self._local.connection = cached
+        return cached[1]
+
+    def _close_all(self):
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for con in connections:
+            try: con.close()
+            except sqlite3.Error: pass
+        self._writer = None
+        self._generation += 1
+        self._migrated = False
+
+    # --- Ejecución con métricas ---
+    async def _run(self, executor, get_connection, fn, label):
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            try:
+                return fn(get_connection())
+            finally:
+                finished = time.perf_counter()
+                stats = self.stats.get(label)
+                if stats is None:
+                    stats = self.stats[label] = QueryStats()
+                stats.record(finished - started, started - submitted)
+                for observer in self.observers:
+                    observer(label, finished - started, started - submitted)
+
+        return await asyncio.get_running_loop().run_in_executor(executor, job)
+
+    async def run_write(self, fn, *, label: str):
+        """Ejecuta `fn(con)` en el hilo de escritura dentro de una única transacción."""
+        def transaction(con):
+            with con:
+                return fn(con)
+        return await self._run(self._write_executor, self._writer_connection, transaction, label)
+
+    async def run_read(self, fn, *, label: str):
+        """Ejecuta `fn(con)` en una de las conexiones de lectura."""
+        return await self._run(self._read_executor, self._reader_connection, fn, label)
+
+    async def execute(self, sql: str, params=(), *, label: str = None):
+        """Ejecuta una sentencia de escritura y devuelve el número de filas afectadas."""
+        return await self.run_write(lambda con: con.execute(sql, params).rowcount, label=label or _label(sql))
+
+    async def executemany(self, sql: str, seq_of_params, *, label: str = None):
+        """Ejecuta una sentencia para muchas filas en una sola transacción."""
+        rows = list(seq_of_params)
+        return await self.run_write(lambda con: con.executemany(sql, rows).rowcount, label=label or _label(sql))
+
+    async def fetchall(self, sql: str, params=(), *, label: str = None):
+        return await self.run_read(lambda con: con.execute(sql, params).fetchall(), label=label or _label(sql))
+
+    async def fetchone(self, sql: str, params=(), *, label: str = None):
+        return await self.run_read(lambda con: con.execute(sql, params).fetchone(), label=label or _label(sql))
+
+    async def migrate(self):
+        """Aplica las migraciones pendientes del esquema. Es idempotente: solo trabaja la primera vez por archivo."""
+        async with self._migrate_lock:
+            if self._migrated:
+                return []
+            applied = await self._run(self._write_executor, self._writer_connection, apply_migrations, 'migrate')
+            self._migrated = True
+            return applied
+
+    async def reset(self):
+        """Cierra todas las conexiones (p. ej. antes de renombrar el archivo). Se reabren al volver a usarse."""
+        await asyncio.get_running_loop().run_in_executor(self._write_executor, self._close_all)
+
+    def close(self):
+        """Cierra las conexiones y detiene los hilos del executor."""
+        self._write_executor.submit(self._close_all).result()
+        self._write_executor.shutdown(wait=True)
+        self._read_executor.shutdown(wait=True)
+
+    def stats_report(self):
+        """Devuelve las estadísticas por consulta, ordenadas por tiempo total: (etiqueta, n, media_ms, max_ms, espera_media_ms)."""
+        report = []
+        for label, s in self.stats.items():
+            if s.count:
+                report.append((label, s.count, s.total / s.count * 1000, s.max * 1000, s.wait_total / s.count * 1000))
+        return sorted(report, key=lambda row: row[1] * row[2], reverse=True)
+
+def _label(sql: str) -> str:
+    """Etiqueta por defecto para una consulta: su texto normalizado y recortado."""
+    return " ".join(sql.split())[:60]
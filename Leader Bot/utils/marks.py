@@ -0,0 +1,129 @@
+# utils/marks.py
+# Marcas de agua por canal: el último mensaje de cada canal de envíos que el bot ya ha procesado.
+import asyncio
+from datetime import datetime, timezone
+
+# --- CONFIGURACIÓN ---
+MARK_FLUSH_DELAY = 5.0 # Segundos durante los que se agrupan los avances de marca antes de escribirlos.
+
+class ChannelMarks:
+    """
+    channel_id -> último message_id procesado, guardado en la tabla `channel_marks`.
+
+    Mientras un canal se está poniendo al día tras arrancar (ver Admin.catch_up) su marca
+    no avanza con los mensajes en vivo, solo con los que se van reprocesando: así, si el bot
+    cae a mitad de la recuperación, el siguiente arranque retoma desde el último mensaje
+    realmente reprocesado y no se salta ninguno. Los mensajes en vivo de ese periodo se
+    aplican al terminar (`release`).
+
+    Las marcas avanzan desde el principio; solo si alguien anuncia una recuperación
+    (`expect_catch_up`, Admin al cargarse) se retienen todos los canales hasta que empieza.
+    """
+    def __init__(self, db, delay: float = MARK_FLUSH_DELAY):
+        self.db = db
+        self.delay = delay
+        self._marks = {}    # channel_id -> (guild_id, message_id)
+        self._dirty = set()
+        self._held = set()  # canales poniéndose al día
+        self._live = {}     # channel_id -> (guild_id, message_id) visto en vivo mientras estaba retenido
+        self._awaiting_catch_up = False
+        self._timer = None
+
+    async def load(self):
+        """Carga las marcas guardadas. Devuelve una copia channel_id -> message_id."""
+        rows = await self.db.fetchall("SELECT channel_id, guild_id, last_message_id FROM channel_marks", label='marks_load')
+        for channel_id, guild_id, message_id in rows:
+            self._marks[channel_id] = (guild_id, message_id)
+        return self.get_all()
+
+    def get_all(self):
+        return {channel_id: message_id for channel_id, (_, message_id) in self._marks.items()}
+
+    def get(self, channel_id: int):
+        mark = self._marks.get(channel_id)
+        return mark[1] if mark else None
+
+    def advance(self, guild_id: int, channel_id: int, message_id: int):
+        """Un mensaje en vivo ya procesado. Si hay una recuperación anunciada y aún no empezó, todos los canales están retenidos."""
+        if self._awaiting_catch_up or channel_id in self._held:
+            current = self._live.get(channel_id)
+            if current is None or message_id > current[1]:
+                self._live[channel_id] = (guild_id, message_id)
+            return
+        self._set(guild_id, channel_id, message_id)
+
+    def replayed(self, guild_id: int, channel_id: int, message_id: int):
+        """Un mensaje reprocesado durante la recuperación (o un escaneo manual)."""
+        self._set(guild_id, channel_id, message_id)
+
+    def expect_catch_up(self):
+        """Anuncia una recuperación: hasta `hold` (o `resume`) ningún canal avanza con mensajes en vivo."""
+        self._awaiting_catch_up = True
+
+    def hold(self, channel_ids):
+        """Empieza la recuperación: retiene `channel_ids` y libera la marca en vivo de todos los demás."""
+        self._held.update(channel_ids)
+        self.resume()
+
+    def resume(self):
+        """Deja de esperar la recuperación anunciada (empezó, falló o se descargó Admin). Los canales retenidos siguen así."""
+        self._awaiting_catch_up = False
+        for channel_id in [c for c in self._live if c not in self._held]:
+            guild_id, message_id = self._live.pop(channel_id)
+            self._set(guild_id, channel_id, message_id)
+
+    def release(self, channel_id: int):
+        """Fin de la recuperación de un canal: aplica lo visto en vivo mientras tanto."""
+        self._held.discard(channel_id)
+        live = self._live.pop(channel_id, None)
+        if live is not None:
+            self._set(live[0], channel_id, live[1])
+
+    def _set(self, guild_id, channel_id, message_id):
+        current = self._marks.get(channel_id)
+        if current is not None and current[1] >= message_id:
+            return
+        self._marks[channel_id] = (guild_id, message_id)
+        self._dirty.add(channel_id)
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._timer is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._timer = loop.call_later(self.delay, self._start_flush)
+
+    def _start_flush(self):
+        self._timer = None
+        asyncio.ensure_future(self._flush_logged())
+
+    async def _flush_logged(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"Error al guardar las marcas de canal: {e}")
+
+    async def flush(self):
+        """Escribe las marcas que han avanzado. Nunca retrocede una marca ya guardada."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._dirty:
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        dirty, self._dirty = self._dirty, set()
+        rows = [(channel_id, *self._marks[channel_id], now) for channel_id in dirty]
+        try:
+            await self.db.executemany('''
+                INSERT INTO channel_marks (channel_id, guild_id, last_message_id, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (channel_id) DO UPDATE SET
+                    last_message_id = MAX(last_message_id, excluded.last_message_id),
+                    updated_at = excluded.updated_at
+            ''', rows, label='marks_flush')
+        except Exception:
+            # Se reintentan en el siguiente guardado.
+            self._dirty |= dirty
+            raise
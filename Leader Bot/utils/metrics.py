@@ -0,0 +1,246 @@
+# utils/metrics.py
+# Métricas del bot en formato de texto de Prometheus, servidas en un puerto local opcional.
+import asyncio
+import math
+import os
+import re
+import threading
+import time
+import aiohttp
+from aiohttp import web
+
+# --- CONFIGURACIÓN ---
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0)) # 0 = sin endpoint (las métricas se siguen recogiendo).
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+LOOP_LAG_INTERVAL = 1.0 # Segundos entre mediciones del retraso del event loop.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# IDs (snowflakes), emojis y tokens de la URL se sustituyen para que cada ruta sea una sola serie.
+# Los tokens de interacción/webhook, además, no deben aparecer nunca en el endpoint (sin autenticación).
+_SNOWFLAKE_RE = re.compile(r'/\d{15,21}(?=/|$)')
+_TOKEN_RE = re.compile(r'^(/(?:interactions|webhooks)/\d+)/[^/]+')
+_REACTION_RE = re.compile(r'/reactions/[^/]+')
+_API_PREFIX_RE = re.compile(r'^/api/v\d+')
+
+def route_of(path: str) -> str:
+    """
+    Convierte la ruta de una petición a la API en su plantilla: /channels/{id}/messages/{id}.
+
+    >>> route_of('/api/v10/interactions/1234567890123456789/aW50ZXJhY3Rpb246dG9rZW4/callback')
+    '/interactions/{id}/{token}/callback'
+    >>> route_of('/api/v10/webhooks/1234567890123456789/aW50ZXJhY3Rpb246dG9rZW4/messages/@original')
+    '/webhooks/{id}/{token}/messages/@original'
+    >>> route_of('/api/v10/channels/1234567890123456789/messages/1234567890123456780/reactions/%E2%9C%85/@me')
+    '/channels/{id}/messages/{id}/reactions/{emoji}/@me'
+    """
+    path = _API_PREFIX_RE.sub('', path)
+    path = _TOKEN_RE.sub(r'\1/{token}', path)
+    path = _REACTION_RE.sub('/reactions/{emoji}', path)
+    return _SNOWFLAKE_RE.sub('/{id}', path)
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names, values, extra=None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _le(bound) -> str:
+    return 'le="+Inf"' if bound == math.inf else f'le="{bound}"'
+
+def _format_value(value) -> str:
+    if value == math.inf: return '+Inf'
+    if value != value: return 'NaN'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    """Histograma con etiquetas. `observe()` se puede llamar desde cualquier hilo (p. ej. los de SQLite)."""
+    def __init__(self, name: str, help_text: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # valores de etiquetas -> [contadores por bucket..., suma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help_text}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            snapshot = [(values, list(series)) for values, series in self._series.items()]
+        for values, series in sorted(snapshot):
+            for bound, count in zip(self.buckets, series):
+                yield f'{self.name}_bucket{_format_labels(self.labels, values, _le(bound))} {count}'
+            yield f'{self.name}_bucket{_format_labels(self.labels, values, _le(math.inf))} {series[-1]}'
+            yield f'{self.name}_sum{_format_labels(self.labels, values)} {series[-2]!r}'
+            yield f'{self.name}_count{_format_labels(self.labels, values)} {series[-1]}'
+
+class Counter:
+    """Contador con etiquetas."""
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: int = 1):
+        with self._lock:
+            self._series[label_values] = self._series.get(label_values, 0) + amount
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help_text}'
+        yield f'# TYPE {self.name} counter'
+        with self._lock:
+            snapshot = sorted(self._series.items())
+        for values, count in snapshot:
+            yield f'{self.name}{_format_labels(self.labels, values)} {count}'
+
+def _render_gauge(name: str, help_text: str, samples, labels=()):
+    """`samples` es una lista de (valores_de_etiquetas, valor)."""
+    yield f'# HELP {name} {help_text}'
+    yield f'# TYPE {name} gauge'
+    for values, value in samples:
+        yield f'{name}{_format_labels(labels, values)} {_format_value(value)}'
+
+class Metrics:
+    """
+    Métricas de todo el bot:
+    - Latencia de los manejadores por evento y cog (la mide el Enrutador, por el que pasa todo).
+    - Latencia de las consultas SQLite por etiqueta (observador de utils/database.py).
+    - Peticiones REST a Discord por ruta y estado, y respuestas 429 (TraceConfig de aiohttp).
+    - Retraso del event loop, colas internas, envíos pendientes y latencia del gateway (al consultar).
+    """
+    def __init__(self, bot, port: int = METRICS_PORT, host: str = METRICS_HOST):
+        self.bot = bot
+        self.port = port
+        self.host = host
+        self.handler_latency = Histogram('kompany_handler_seconds', 'Tiempo de los manejadores de eventos por cog.', ('event', 'cog'))
+        self.query_latency = Histogram('kompany_sqlite_query_seconds', 'Tiempo de ejecución de las consultas SQLite.', ('label',))
+        self.query_wait = Histogram('kompany_sqlite_wait_seconds', 'Tiempo de espera en la cola del executor de SQLite.', ('label',))
+        self.http_latency = Histogram('kompany_discord_http_seconds', 'Peticiones REST a Discord por ruta.', ('method', 'route', 'status'))
+        self.http_ratelimited = Counter('kompany_discord_http_429_total', 'Respuestas 429 (rate limit) de Discord por ruta.', ('method', 'route'))
+        self.loop_lag = Histogram('kompany_event_loop_lag_seconds', 'Retraso del event loop respecto a lo programado.')
+        self._last_loop_lag = 0.0
+        self._lag_task = None
+        self._runner = None
+
+    # --- Fuentes de datos ---
+    def observe_handler(self, event: str, cog: str, elapsed: float):
+        self.handler_latency.observe(elapsed, event, cog)
+
+    def observe_query(self, label: str, elapsed: float, waited: float):
+        """Observador de Database (se llama desde los hilos de SQLite)."""
+        self.query_latency.observe(elapsed, label)
+        self.query_wait.observe(waited, label)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """TraceConfig para `http_trace` del cliente de discord.py: mide cada petición REST."""
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            context.started = time.perf_counter()
+
+        async def on_request_end(session, context, params):
+            self._observe_request(context, params.method, params.url.path, params.response.status)
+
+        async def on_request_exception(session, context, params):
+            self._observe_request(context, params.method, params.url.path, 'error')
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_end.append(on_request_end)
+        trace.on_request_exception.append(on_request_exception)
+        return trace
+
+    def _observe_request(self, context, method: str, path: str, status):
+        started = getattr(context, 'started', None)
+        if started is None:
+            return
+        route = route_of(path)
+        self.http_latency.observe(time.perf_counter() - started, method, route, str(status))
+        if status == 429:
+            self.http_ratelimited.inc(method, route)
+
+    async def _measure_loop_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LOOP_LAG_INTERVAL
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            self._last_loop_lag = max(0.0, loop.time() - expected)
+            self.loop_lag.observe(self._last_loop_lag)
+
+    async def _queue_depths(self):
+        depths = [
+            (('audit',), self.bot.audit.pending()),
+            (('reaction_cleanup',), self.bot.reaction_cleaner.pending()),
+        ]
+        puntos_cog = self.bot.get_cog('Puntos')
+        if puntos_cog:
+            depths.append((('ledger',), puntos_cog.ledger_pending()))
+        return depths
+
+    async def _pending_submissions(self):
+        rows = await self.bot.db.fetchall(
+            "SELECT kind, COUNT(*) FROM submissions WHERE status = 'pending' GROUP BY kind", label='metrics_pending')
+        return [((kind,), count) for kind, count in rows]
+
+    async def render(self) -> str:
+        lines = []
+        for metric in (self.handler_latency, self.query_latency, self.query_wait,
+                       self.http_latency, self.http_ratelimited, self.loop_lag):
+            lines.extend(metric.render())
+        lines.extend(_render_gauge('kompany_event_loop_lag_last_seconds', 'Último retraso medido del event loop.',
+                                   [((), self._last_loop_lag)]))
+        lines.extend(_render_gauge('kompany_queue_depth', 'Trabajos en las colas internas del bot.',
+                                   await self._queue_depths(), ('queue',)))
+        lines.extend(_render_gauge('kompany_pending_submissions', 'Envíos pendientes de revisión por tipo.',
+                                   await self._pending_submissions(), ('kind',)))
+        lines.extend(_render_gauge('kompany_gateway_latency_seconds', 'Latencia del heartbeat del gateway.',
+                                   [((), self.bot.latency)]))
+        return '\n'.join(lines) + '\n'
+
+    # --- Servidor HTTP ---
+    async def _handle_metrics(self, request):
+        return web.Response(text=await self.render(), content_type='text/plain', charset='utf-8',
+                            headers={'X-Content-Type-Options': 'nosniff'})
+
+    async def start(self):
+        """Arranca la medición del event loop y, si METRICS_PORT está definido, el endpoint /metrics."""
+        if self._lag_task is None:
+            self._lag_task = asyncio.create_task(self._measure_loop_lag())
+        if not self.port or self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, self.host, self.port).start()
+        except OSError as e:
+            print(f"❌ No se pudo abrir el endpoint de métricas en {self.host}:{self.port}: {e}")
+            await self._runner.cleanup()
+            self._runner = None
+            return
+        print(f"✅ Métricas disponibles en http://{self.host}:{self.port}/metrics")
+
+    async def close(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            await asyncio.gather(self._lag_task, return_exceptions=True)
+            self._lag_task = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,187 @@
+# utils/migrations.py
+# Migraciones versionadas del esquema de leaderboard.db.
+# La versión aplicada se guarda en `PRAGMA user_version`; cada migración se ejecuta en su
+# propia transacción y nunca debe modificarse una vez publicada (se añade una nueva).
+import sqlite3
+
+# --- Tabla materializada de totales ---
+# Cada categoría tiene su propia columna en `totals`; se mantiene sincronizada mediante un trigger
+# sobre `puntuaciones`, así que también recoge las reversiones negativas al cambiar una decisión.
+TOTALS_CATEGORIES = ('ataque', 'defensa', 'tempo', 'interserver', 'koth', 'manual')
+_CATEGORY_COLUMNS = ", ".join(TOTALS_CATEGORIES)
+_CATEGORY_SUMS = ", ".join(f"SUM(CASE WHEN category = '{c}' THEN points ELSE 0 END)" for c in TOTALS_CATEGORIES)
+
+MIGRATIONS = []
+
+def migration(version: int, description: str):
+    """Registra una función `fn(con)` como la migración número `version`."""
+    def decorator(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return decorator
+
+def _columns(con, table):
+    return {row[1] for row in con.execute(f"PRAGMA table_info({table})")}
+
+# --- MIGRACIONES ---
+@migration(1, "Esquema base: libro de puntos, tabla de totales y trigger")
+def _base_schema(con):
+    # Se usa IF NOT EXISTS porque las bases de datos anteriores al sistema de migraciones
+    # (user_version = 0) ya tienen la tabla `puntuaciones`.
+    con.execute('''
+        CREATE TABLE IF NOT EXISTS puntuaciones (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, guild_id INTEGER NOT NULL,
+            category TEXT NOT NULL, points INTEGER NOT NULL, timestamp DATETIME NOT NULL
+        )
+    ''')
+    con.execute(f'''
+        CREATE TABLE IF NOT EXISTS totals (
+            guild_id INTEGER NOT NULL, user_id INTEGER NOT NULL, points INTEGER NOT NULL DEFAULT 0,
+            {", ".join(f"{c} INTEGER NOT NULL DEFAULT 0" for c in TOTALS_CATEGORIES)},
+            PRIMARY KEY (guild_id, user_id)
+        )
+    ''')
+    con.execute("DROP INDEX IF EXISTS idx_totals_ranking")
+    con.execute("CREATE INDEX idx_totals_ranking ON totals (guild_id, points DESC, user_id)")
+    con.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_puntuaciones_totals AFTER INSERT ON puntuaciones
+        BEGIN
+            INSERT INTO totals (guild_id, user_id, points, {_CATEGORY_COLUMNS})
+            VALUES (NEW.guild_id, NEW.user_id, NEW.points, {", ".join(f"CASE WHEN NEW.category = '{c}' THEN NEW.points ELSE 0 END" for c in TOTALS_CATEGORIES)})
+            ON CONFLICT (guild_id, user_id) DO UPDATE SET
+                points = points + excluded.points,
+                {", ".join(f"{c} = {c} + excluded.{c}" for c in TOTALS_CATEGORIES)};
+        END
+    ''')
+    # Bases de datos con historial previo a la tabla de totales: se rellena una sola vez.
+    if con.execute("SELECT 1 FROM totals LIMIT 1").fetchone() is None:
+        con.execute(f'''
+            INSERT INTO totals (guild_id, user_id, points, {_CATEGORY_COLUMNS})
+            SELECT guild_id, user_id, SUM(points), {_CATEGORY_SUMS}
+            FROM puntuaciones GROUP BY guild_id, user_id
+        ''')
+
+@migration(2, "Índices compuestos del libro de puntos")
+def _ledger_indexes(con):
+    con.execute("CREATE INDEX IF NOT EXISTS idx_puntuaciones_guild_user ON puntuaciones (guild_id, user_id)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_puntuaciones_guild_timestamp ON puntuaciones (guild_id, timestamp)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_puntuaciones_guild_category ON puntuaciones (guild_id, category)")
+
+@migration(3, "Columnas submission_id y season_id en el libro de puntos")
+def _ledger_submission_and_season(con):
+    columns = _columns(con, 'puntuaciones')
+    if 'submission_id' not in columns:
+        con.execute("ALTER TABLE puntuaciones ADD COLUMN submission_id TEXT")
+    if 'season_id' not in columns:
+        con.execute("ALTER TABLE puntuaciones ADD COLUMN season_id INTEGER")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_puntuaciones_submission ON puntuaciones (submission_id)")
+
+@migration(4, "Snapshots del ranking por servidor")
+def _rank_snapshots(con):
+    con.execute('''
+        CREATE TABLE IF NOT EXISTS rank_snapshots (
+            guild_id INTEGER NOT NULL, taken_at TEXT NOT NULL, user_id INTEGER NOT NULL,
+            rank INTEGER NOT NULL, points INTEGER NOT NULL,
+            PRIMARY KEY (guild_id, taken_at, user_id)
+        )
+    ''')
+
+@migration(5, "Tabla única de envíos (sustituye a pending_*/judged_*.json)")
+def _submissions(con):
+    con.execute('''
+        CREATE TABLE IF NOT EXISTS submissions (
+            message_id INTEGER PRIMARY KEY, kind TEXT NOT NULL, guild_id INTEGER, channel_id INTEGER,
+            points INTEGER, allies TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'pending',
+            judged_by INTEGER, created_at TEXT NOT NULL, judged_at TEXT
+        )
+    ''')
+    con.execute("CREATE INDEX IF NOT EXISTS idx_submissions_kind_status ON submissions (kind, status)")
+
+@migration(6, "Índice de envíos juzgados por fecha de decisión")
+def _submissions_judged_index(con):
+    con.execute("CREATE INDEX IF NOT EXISTS idx_submissions_kind_judged ON submissions (kind, judged_at)")
+
+@migration(7, "Último mensaje procesado por canal de envíos (recuperación tras una caída)")
+def _channel_marks(con):
+    con.execute('''
+        CREATE TABLE IF NOT EXISTS channel_marks (
+            channel_id INTEGER PRIMARY KEY, guild_id INTEGER NOT NULL,
+            last_message_id INTEGER NOT NULL, updated_at TEXT NOT NULL
+        )
+    ''')
+
+@migration(8, "Temporadas como season_id: tabla de temporadas y totales por temporada")
+def _seasons(con):
+    con.execute('''
+        CREATE TABLE IF NOT EXISTS seasons (
+            season_id INTEGER PRIMARY KEY, name TEXT, started_at TEXT, ended_at TEXT,
+            archived_at TEXT, archive_path TEXT
+        )
+    ''')
+    # Fila única con la temporada a la que van los puntos nuevos. NULL hasta que Temporadas la
+    # inicializa desde season_status.json (ver utils/seasons.py).
+    con.execute("CREATE TABLE IF NOT EXISTS season_state (id INTEGER PRIMARY KEY CHECK (id = 1), current_season_id INTEGER)")
+    con.execute("INSERT OR IGNORE INTO season_state (id, current_season_id) VALUES (1, NULL)")
+
+    # `totals` pasa a tener una fila por (servidor, temporada, usuario). El trigger se recrea después
+    # del cambio de tabla; las filas sin temporada se agrupan en la temporada 0.
+    con.execute("DROP TRIGGER IF EXISTS trg_puntuaciones_totals")
+    con.execute(f'''
+        CREATE TABLE totals_new (
+            guild_id INTEGER NOT NULL, season_id INTEGER NOT NULL DEFAULT 0, user_id INTEGER NOT NULL,
+            points INTEGER NOT NULL DEFAULT 0,
+            {", ".join(f"{c} INTEGER NOT NULL DEFAULT 0" for c in TOTALS_CATEGORIES)},
+            PRIMARY KEY (guild_id, season_id, user_id)
+        )
+    ''')
+    con.execute(f'''
+        INSERT INTO totals_new (guild_id, season_id, user_id, points, {_CATEGORY_COLUMNS})
+        SELECT guild_id, 0, user_id, points, {_CATEGORY_COLUMNS} FROM totals
+    ''')
+    con.execute("DROP TABLE totals")
+    con.execute("ALTER TABLE totals_new RENAME TO totals")
+    con.execute("CREATE INDEX idx_totals_ranking ON totals (guild_id, season_id, points DESC, user_id)")
+    con.execute(f'''
+        CREATE TRIGGER trg_puntuaciones_totals AFTER INSERT ON puntuaciones
+        BEGIN
+            INSERT INTO totals (guild_id, season_id, user_id, points, {_CATEGORY_COLUMNS})
+            VALUES (NEW.guild_id, COALESCE(NEW.season_id, 0), NEW.user_id, NEW.points, {", ".join(f"CASE WHEN NEW.category = '{c}' THEN NEW.points ELSE 0 END" for c in TOTALS_CATEGORIES)})
+            ON CONFLICT (guild_id, season_id, user_id) DO UPDATE SET
+                points = points + excluded.points,
+                {", ".join(f"{c} = {c} + excluded.{c}" for c in TOTALS_CATEGORIES)};
+        END
+    ''')
+    con.execute("CREATE INDEX IF NOT EXISTS idx_puntuaciones_season ON puntuaciones (season_id, guild_id)")
+    if 'season_id' not in _columns(con, 'rank_snapshots'):
+        con.execute("ALTER TABLE rank_snapshots ADD COLUMN season_id INTEGER NOT NULL DEFAULT 0")
+
+# --- EJECUCIÓN ---
+def apply_migrations(con: sqlite3.Connection):
+    """Aplica en orden las migraciones pendientes. Devuelve la lista de versiones aplicadas."""
+    current = con.execute("PRAGMA user_version").fetchone()[0]
+    applied = []
+    for version, description, fn in MIGRATIONS:
+        if version <= current:
+            continue
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            fn(con)
+            con.execute(f"PRAGMA user_version = {version}")
+            con.commit()
+        except Exception:
+            con.rollback()
+            raise
+        print(f"Migración {version} aplicada: {description}")
+        applied.append(version)
+    return applied
+
+def rebuild_totals(con):
+    """Recalcula la tabla de totales (de todas las temporadas) desde cero a partir del libro de puntos."""
+    con.execute("DELETE FROM totals")
+    con.execute(f'''
+        INSERT INTO totals (guild_id, season_id, user_id, points, {_CATEGORY_COLUMNS})
+        SELECT guild_id, COALESCE(season_id, 0), user_id, SUM(points), {_CATEGORY_SUMS}
+        FROM puntuaciones GROUP BY guild_id, COALESCE(season_id, 0), user_id
+    ''')
+    return con.execute("SELECT COUNT(*) FROM totals").fetchone()[0]
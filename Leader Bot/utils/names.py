@@ -0,0 +1,97 @@
+# utils/names.py
+# Resolución de nombres visibles de miembros, compartida por todos los cogs.
+import asyncio
+import time
+from collections import OrderedDict
+import discord
+
+# --- CONFIGURACIÓN ---
+NAME_CACHE_SIZE = 5000   # Entradas máximas en la caché LRU.
+NAME_CACHE_TTL = 900     # Segundos que un nombre se considera válido.
+QUERY_CHUNK_SIZE = 100   # Máximo de IDs por petición de miembros al gateway.
+
+class NameResolver:
+    """
+    Traduce IDs de usuario a nombres visibles de un servidor.
+    Orden de búsqueda: caché LRU con caducidad → caché de miembros del gateway →
+    consultas de miembros por lotes → `fetch_member` solo como último recurso.
+    """
+    def __init__(self, max_size: int = NAME_CACHE_SIZE, ttl: float = NAME_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._cache = OrderedDict()  # (guild_id, user_id) -> (caduca_en, nombre o None)
+        self.hits = 0
+        self.misses = 0
+
+    def _get_cached(self, guild_id, user_id):
+        key = (guild_id, user_id)
+        entry = self._cache.get(key)
+        if entry is None:
+            return False, None
+        expires_at, name = entry
+        if expires_at < time.monotonic():
+            del self._cache[key]
+            return False, None
+        self._cache.move_to_end(key)
+        return True, name
+
+    def _store(self, guild_id, user_id, name):
+        key = (guild_id, user_id)
+        self._cache[key] = (time.monotonic() + self.ttl, name)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def invalidate(self, guild_id, user_id):
+        self._cache.pop((guild_id, user_id), None)
+
+    async def resolve_many(self, guild: discord.Guild, user_ids) -> dict:
+        """Devuelve `{user_id: nombre}`; el valor es None si el usuario ya no está en el servidor."""
+        names = {}
+        missing = []
+        for user_id in dict.fromkeys(int(uid) for uid in user_ids):
+            found, name = self._get_cached(guild.id, user_id)
+            if found:
+                self.hits += 1
+                names[user_id] = name
+                continue
+            self.misses += 1
+            member = guild.get_member(user_id)
+            if member is not None:
+                names[user_id] = member.display_name
+                self._store(guild.id, user_id, member.display_name)
+            else:
+                missing.append(user_id)
+
+        for start in range(0, len(missing), QUERY_CHUNK_SIZE):
+            chunk = missing[start:start + QUERY_CHUNK_SIZE]
+            try:
+                members = await guild.query_members(user_ids=chunk, limit=len(chunk), cache=True)
+            except (discord.ClientException, asyncio.TimeoutError):
+                members = await self._fetch_one_by_one(guild, chunk)
+            found_ids = set()
+            for member in members:
+                found_ids.add(member.id)
+                names[member.id] = member.display_name
+                self._store(guild.id, member.id, member.display_name)
+            for user_id in chunk:
+                if user_id not in found_ids:
+                    names[user_id] = None
+                    self._store(guild.id, user_id, None)
+        return names
+
+    async def resolve(self, guild: discord.Guild, user_id) -> str:
+        return (await self.resolve_many(guild, [user_id])).get(int(user_id))
+
+    async def _fetch_one_by_one(self, guild, user_ids):
+        members = []
+        for user_id in user_ids:
+            try:
+                members.append(await guild.fetch_member(user_id))
+            except discord.NotFound:
+                pass
+        return members
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._cache), 'hit_rate': (self.hits / total) if total else 0.0}
@@ -0,0 +1,114 @@
+# utils/parser.py
+# Parser compartido de envíos: una sola expresión compilada y las tablas de puntos de todos los tipos.
+# No depende de discord para poder medirse aislado (ver benchmarks/test_parser_bench.py).
+import re
+
+from utils.channels import ChannelInfo
+
+# Menciones de usuario (<@123> o <@!123>). Se guarda el ID como texto, igual que en submissions.allies.
+MENTION_RE = re.compile(r'<@!?(\d+)>')
+
+# --- Tablas de Puntos ---
+ATTACK_POINTS = [
+#   0 Ene, 1 Ene, 2 Ene, 3 Ene, 4 Ene, 5 Ene
+    [5,     120,   150,   180,   210,   240], # 1 Aliado
+    [5,      90,   120,   150,   180,   210], # 2 Aliados
+    [5,      60,    90,   120,   150,   180], # 3 Aliados
+    [5,      30,    60,    90,   120,   150], # 4 Aliados
+    [5,      15,    30,    60,    90,   120]  # 5 Aliados
+]
+
+DEFENSE_POINTS = [
+#   0 Ene, 1 Ene, 2 Ene, 3 Ene, 4 Ene, 5 Ene
+    [0,    120,   150,   180,   210,   240], # 1 Aliado
+    [0,     90,   120,   150,   180,   210], # 2 Aliados
+    [0,     60,    90,   120,   150,   180], # 3 Aliados
+    [0,     15,    60,    90,   120,   150], # 4 Aliados
+    [0,      5,    15,    60,    90,   120]  # 5 Aliados
+]
+
+TEMPO_POINTS = {
+    "5-10min": 15,
+    "10-15min": 25,
+    "15-20min": 40,
+    "20-25min": 50,
+    "25-30min": 60,
+    "plus-de-30": 75,
+}
+
+INTERSERVER_POINTS = {
+    "tempo-no_def-v1": 2,
+    "koth-v2-v3": 10,
+    "v4-v5": 30,
+}
+
+GRID_POINTS = {'ataque': ATTACK_POINTS, 'defensa': DEFENSE_POINTS}
+KEYED_POINTS = {'tempo': TEMPO_POINTS, 'interserver': INTERSERVER_POINTS}
+
+class ParsedSubmission:
+    """
+    Resultado de analizar un envío válido. `points` es None para KOTH (se decide al aprobar)
+    y puede ser 0 si la tabla no da puntos a esa combinación; cada Cog decide qué hacer entonces.
+    """
+    __slots__ = ('kind', 'allies', 'enemies', 'points')
+
+    def __init__(self, kind: str, allies: list, enemies: int, points):
+        self.kind = kind
+        self.allies = allies
+        self.enemies = enemies
+        self.points = points
+
+    def as_submission(self) -> dict:
+        """El dict que se guarda en pendientes (mismo formato que el histórico)."""
+        if self.points is None:
+            return {'allies': self.allies}
+        return {'points': self.points, 'allies': self.allies}
+
+    def __repr__(self):
+        return (f"ParsedSubmission(kind={self.kind!r}, allies={len(self.allies)}, "
+                f"enemies={self.enemies}, points={self.points})")
+
+def has_image(attachments) -> bool:
+    """True si algún adjunto es una imagen. Los adjuntos sin content_type no cuentan."""
+    for att in attachments:
+        content_type = att.content_type
+        if content_type and content_type.startswith('image/'):
+            return True
+    return False
+
+def parse_content(content: str, image: bool, channel_info: ChannelInfo):
+    """
+    Analiza el texto de un envío ya clasificado por canal. Devuelve un ParsedSubmission,
+    o None si el envío no es válido (sin imagen, sin menciones o fuera de la tabla).
+    """
+    if not image or channel_info is None:
+        return None
+    allies = MENTION_RE.findall(content)
+    if not allies:
+        return None
+
+    kind = channel_info.kind
+    grid = GRID_POINTS.get(kind)
+    if grid is not None:
+        num_allies = len(allies)
+        num_enemies = channel_info.enemies
+        if not (1 <= num_allies <= 5 and 0 <= num_enemies <= 5):
+            return None
+        return ParsedSubmission(kind, allies, num_enemies, grid[num_allies - 1][num_enemies])
+
+    table = KEYED_POINTS.get(kind)
+    if table is not None:
+        points = table.get(channel_info.key)
+        if points is None:
+            return None
+        return ParsedSubmission(kind, allies, 0, points)
+
+    if kind == 'koth':
+        return ParsedSubmission(kind, allies, 0, None)
+    return None
+
+def parse_submission(message, channel_info: ChannelInfo):
+    """Atajo para un discord.Message: comprueba los adjuntos antes de mirar el texto."""
+    if not message.attachments:
+        return None
+    return parse_content(message.content, has_image(message.attachments), channel_info)
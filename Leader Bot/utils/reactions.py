@@ -0,0 +1,68 @@
+# utils/reactions.py
+# Limpieza en segundo plano de las reacciones opuestas (✅/❌) de los envíos juzgados.
+import asyncio
+import discord
+
+# --- CONFIGURACIÓN ---
+REACTION_CLEANUP_CONCURRENCY = 2 # Mensajes que se limpian a la vez (las llamadas comparten el bucket de reacciones del canal).
+
+class ReactionCleaner:
+    """
+    Cola de trabajos "quitar el emoji X del mensaje M". Los trabajos sobre el mismo mensaje se
+    agrupan (gana el último: es la decisión vigente), así que un admin que cambia de opinión
+    varias veces seguidas produce una sola limpieza. `request()` nunca espera a Discord.
+    """
+    def __init__(self, bot, concurrency: int = REACTION_CLEANUP_CONCURRENCY):
+        self.bot = bot
+        self.concurrency = concurrency
+        self._jobs = {}   # message_id -> (channel_id, emoji) aún no procesado
+        self._queue = asyncio.Queue()
+        self._workers = []
+        self.cleared = 0
+        self.collapsed = 0
+
+    def request(self, channel_id: int, message_id: int, emoji: str):
+        """Programa la limpieza de `emoji` en el mensaje. Si ya había un trabajo para él, lo sustituye."""
+        if message_id in self._jobs:
+            self.collapsed += 1
+        else:
+            self._queue.put_nowait(message_id)
+        self._jobs[message_id] = (channel_id, emoji)
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    def pending(self) -> int:
+        return len(self._jobs)
+
+    async def close(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _worker(self):
+        while True:
+            message_id = await self._queue.get()
+            job = self._jobs.pop(message_id, None)
+            if job is None:
+                continue
+            channel_id, emoji = job
+            try:
+                await self._clear(channel_id, message_id, emoji)
+                self.cleared += 1
+            except (discord.NotFound, discord.Forbidden, discord.HTTPException):
+                print(f"No se pudieron gestionar las reacciones opuestas del mensaje {message_id}")
+            except Exception as e:
+                print(f"Error inesperado limpiando reacciones del mensaje {message_id}: {e}")
+
+    async def _clear(self, channel_id: int, message_id: int, emoji: str):
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            return
+        permissions = channel.permissions_for(channel.guild.me)
+        if not permissions.manage_messages:
+            # Sin "Gestionar mensajes" no se pueden quitar reacciones ajenas de ninguna forma.
+            print(f"Sin permiso para gestionar las reacciones del mensaje {message_id}")
+            return
+        # Una sola llamada quita el emoji de todos los usuarios.
+        await channel.get_partial_message(message_id).clear_reaction(emoji)
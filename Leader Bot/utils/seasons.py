@@ -0,0 +1,131 @@
+# utils/seasons.py
+# Temporadas sobre una única base de datos: cada fila del libro de puntos lleva su season_id.
+# Terminar una temporada es un cambio de metadatos; el archivo season-N-leaderboard.db se genera
+# después, en segundo plano, con la API de copia en caliente de SQLite.
+import asyncio
+import os
+import sqlite3
+from datetime import datetime, timezone
+from utils.migrations import rebuild_totals
+
+# --- CONFIGURACIÓN ---
+ARCHIVE_NAME = 'season-{season_id}-leaderboard.db'
+# Temporada a la que se asignan los puntos que se insertan ahora mismo. Se evalúa dentro de cada
+# INSERT, en el hilo de escritura, así que ningún otorgamiento puede caer "entre" dos temporadas.
+CURRENT_SEASON_SQL = "COALESCE((SELECT current_season_id FROM season_state WHERE id = 1), 0)"
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+def _bootstrap(con, season_id: int):
+    """
+    Primera inicialización: fija la temporada actual y le asigna el historial previo sin temporada
+    (NULL si es de antes de la migración, 0 si se otorgó antes de fijar la temporada, ver CURRENT_SEASON_SQL).
+    Después recalcula los totales, que estaban agrupados bajo la temporada 0.
+    """
+    con.execute("UPDATE season_state SET current_season_id = ? WHERE id = 1", (season_id,))
+    con.execute("UPDATE puntuaciones SET season_id = ? WHERE season_id IS NULL OR season_id = 0", (season_id,))
+    con.execute("UPDATE rank_snapshots SET season_id = ? WHERE season_id = 0", (season_id,))
+    con.execute("INSERT OR IGNORE INTO seasons (season_id) VALUES (?)", (season_id,))
+    rebuild_totals(con)
+
+def _start(con, season_id: int, name: str):
+    con.execute("UPDATE season_state SET current_season_id = ? WHERE id = 1", (season_id,))
+    con.execute('''
+        INSERT INTO seasons (season_id, name, started_at) VALUES (?, ?, ?)
+        ON CONFLICT (season_id) DO UPDATE SET name = excluded.name, started_at = excluded.started_at
+    ''', (season_id, name, _now()))
+
+def _end(con, season_id: int):
+    """Cierra `season_id` y abre la siguiente. Los puntos que se escriban después ya van a la nueva."""
+    con.execute('''
+        INSERT INTO seasons (season_id, ended_at) VALUES (?, ?)
+        ON CONFLICT (season_id) DO UPDATE SET ended_at = excluded.ended_at
+    ''', (season_id, _now()))
+    con.execute("UPDATE season_state SET current_season_id = ? WHERE id = 1", (season_id + 1,))
+    con.execute("INSERT OR IGNORE INTO seasons (season_id) VALUES (?)", (season_id + 1,))
+
+def _backup(con, season_id: int, archive_path: str):
+    """
+    Copia la base de datos con `Connection.backup` desde una conexión de lectura (instantánea WAL:
+    las escrituras siguen mientras tanto) y deja en la copia solo los datos de `season_id`.
+    """
+    tmp_path = f"{archive_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    dst = sqlite3.connect(tmp_path)
+    try:
+        con.backup(dst)
+        with dst:
+            dst.execute("DELETE FROM puntuaciones WHERE season_id IS NOT ?", (season_id,))
+            dst.execute("DELETE FROM totals WHERE season_id != ?", (season_id,))
+            dst.execute("DELETE FROM rank_snapshots WHERE season_id != ?", (season_id,))
+            for table in ('submissions', 'channel_marks'):
+                dst.execute(f"DELETE FROM {table}")
+        dst.execute("VACUUM")
+        rows = dst.execute("SELECT COUNT(*) FROM puntuaciones").fetchone()[0]
+    finally:
+        dst.close()
+    os.replace(tmp_path, archive_path)
+    return rows
+
+def _prune(con, season_id: int, archive_path: str):
+    """Tras archivar, retira la temporada de la base de datos en uso y anota dónde quedó."""
+    con.execute("DELETE FROM puntuaciones WHERE season_id = ?", (season_id,))
+    con.execute("DELETE FROM totals WHERE season_id = ?", (season_id,))
+    con.execute("DELETE FROM rank_snapshots WHERE season_id = ?", (season_id,))
+    con.execute("UPDATE seasons SET archived_at = ?, archive_path = ? WHERE season_id = ?", (_now(), archive_path, season_id))
+
+class Seasons:
+    """Temporada actual (en caché para las lecturas del ranking) y operaciones de cambio de temporada."""
+    def __init__(self, db):
+        self.db = db
+        self.current = 0
+        self._archiving = {}  # season_id -> Task
+
+    async def load(self, default_season_id: int):
+        """
+        Lee la temporada actual. La primera vez (season_state vacío) se inicializa con
+        `default_season_id` y el historial existente pasa a pertenecer a esa temporada.
+        """
+        await self.db.migrate()
+        row = await self.db.fetchone("SELECT current_season_id FROM season_state WHERE id = 1", label='season_current')
+        if row is None or row[0] is None:
+            await self.db.run_write(lambda con: _bootstrap(con, default_season_id), label='season_bootstrap')
+            self.current = default_season_id
+        else:
+            self.current = row[0]
+        return self.current
+
+    async def start(self, season_id: int, name: str):
+        await self.db.run_write(lambda con: _start(con, season_id, name), label='season_start')
+        self.current = season_id
+
+    async def end(self, season_id: int):
+        """Cambio de temporada: una sola transacción de metadatos, sin tocar el libro de puntos."""
+        await self.db.run_write(lambda con: _end(con, season_id), label='season_end')
+        self.current = season_id + 1
+
+    async def pending_archives(self):
+        """Temporadas terminadas que aún no se han archivado (p. ej. si el bot se apagó a mitad)."""
+        rows = await self.db.fetchall(
+            "SELECT season_id FROM seasons WHERE ended_at IS NOT NULL AND archived_at IS NULL ORDER BY season_id",
+            label='season_pending_archives')
+        return [season_id for (season_id,) in rows]
+
+    def archive_in_background(self, season_id: int):
+        """Lanza (una sola vez por temporada) el archivado; devuelve la tarea para quien quiera esperarla."""
+        task = self._archiving.get(season_id)
+        if task is None or task.done():
+            task = asyncio.create_task(self.archive(season_id))
+            self._archiving[season_id] = task
+        return task
+
+    async def archive(self, season_id: int):
+        """Genera season-N-leaderboard.db y retira la temporada de la base de datos en uso. Devuelve (ruta, filas)."""
+        archive_path = ARCHIVE_NAME.format(season_id=season_id)
+        if os.path.exists(archive_path):
+            raise FileExistsError(f"Ya existe {archive_path}; no se sobrescribe un archivo de temporada.")
+        rows = await self.db.run_read(lambda con: _backup(con, season_id, archive_path), label='season_backup')
+        await self.db.run_write(lambda con: _prune(con, season_id, archive_path), label='season_prune')
+        return archive_path, rows
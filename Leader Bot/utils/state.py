@@ -0,0 +1,107 @@
+# utils/state.py
+# Escritura atómica y agrupada de los archivos de estado JSON (bot_status, koth_event, season_status...).
+import asyncio
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+# --- CONFIGURACIÓN ---
+STATE_FLUSH_DELAY = 1.0 # Segundos durante los que se agrupan los guardados repetidos del mismo archivo.
+
+def _atomic_write(path: str, text: str):
+    """Escribe en un temporal, hace fsync y lo renombra sobre el destino, guardando la versión anterior como .bak."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    if os.path.exists(path):
+        shutil.copyfile(path, f"{path}.bak")
+    os.replace(tmp_path, path)
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+        try: os.fsync(dir_fd)
+        finally: os.close(dir_fd)
+
+class StateWriter:
+    """
+    Guarda archivos JSON fuera del event loop. Varios `save()` del mismo archivo dentro de la
+    ventana de agrupación producen una sola escritura con el último contenido.
+    """
+    def __init__(self, delay: float = STATE_FLUSH_DELAY):
+        self.delay = delay
+        self._pending = {}   # ruta -> texto JSON aún no escrito
+        self._timers = {}    # ruta -> TimerHandle
+        self._in_flight = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='state-writer')
+        self.writes = 0
+        self.saves = 0
+
+    def save(self, path: str, data):
+        """Programa el guardado de `data` en `path`. Se serializa al momento para capturar el estado actual."""
+        self.saves += 1
+        self._pending[path] = json.dumps(data, indent=4)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Sin event loop (scripts, pruebas): se escribe directamente.
+            self._write(path, self._pending.pop(path))
+            return
+        if path not in self._timers:
+            self._timers[path] = loop.call_later(self.delay, self._start_write, path)
+
+    def load(self, path: str, default):
+        """Lee un archivo de estado; si está dañado o falta, recurre a la copia .bak y, si no, a `default`."""
+        if path in self._pending:
+            return json.loads(self._pending[path])
+        for candidate in (path, f"{path}.bak"):
+            try:
+                with open(candidate, 'r') as f: return json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                continue
+        return default
+
+    async def load_async(self, path: str, default):
+        """Como `load`, pero lee el archivo en un hilo para no bloquear el event loop (p. ej. en `cog_load`)."""
+        if path in self._pending:
+            return json.loads(self._pending[path])
+        return await asyncio.to_thread(self.load, path, default)
+
+    def _write(self, path, text):
+        _atomic_write(path, text)
+        self.writes += 1
+
+    def _start_write(self, path):
+        self._timers.pop(path, None)
+        text = self._pending.pop(path, None)
+        if text is None:
+            return
+        future = asyncio.get_running_loop().run_in_executor(self._executor, self._write, path, text)
+        self._in_flight.add(future)
+        future.add_done_callback(self._write_done)
+
+    def _write_done(self, future):
+        self._in_flight.discard(future)
+        if not future.cancelled() and future.exception():
+            print(f"Error al guardar un archivo de estado: {future.exception()}")
+
+    async def flush(self):
+        """Escribe inmediatamente todo lo pendiente y espera a que termine (usado al apagar el bot)."""
+        for path, timer in list(self._timers.items()):
+            timer.cancel()
+            self._start_write(path)
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+# Instancia compartida por todos los cogs.
+state_writer = StateWriter()
+
+def load_json(path: str, default):
+    return state_writer.load(path, default)
+
+async def load_json_async(path: str, default):
+    return await state_writer.load_async(path, default)
+
+def save_json(path: str, data):
+    state_writer.save(path, data)
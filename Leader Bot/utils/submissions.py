@@ -0,0 +1,177 @@
+# utils/submissions.py
+# Almacén único de envíos (ataque, defensa, tempo, interserver, koth) sobre la tabla `submissions`.
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+# --- CONFIGURACIÓN ---
+# Envíos juzgados que cada cog mantiene en memoria; el resto se consulta en disco cuando hace falta.
+JUDGED_CACHE_SIZE = int(os.getenv("JUDGED_CACHE_SIZE", 500))
+
+# --- Archivos JSON heredados (se importan una sola vez y se renombran a *.imported) ---
+LEGACY_FILES = {
+    'ataque': ('pending_attacks.json', 'judged_attacks.json'),
+    'defensa': ('pending_defenses.json', 'judged_defenses.json'),
+    'tempo': ('pending_tempo.json', 'judged_tempo.json'),
+    'interserver': ('pending_interserver.json', 'judged_interserver.json'),
+    'koth': ('pending_koth.json', 'judged_koth.json'),
+}
+# Envíos juzgados recientes (de todos los tipos) que conserva el índice message_id -> tipo del Enrutador.
+RECENT_INDEX_SIZE = JUDGED_CACHE_SIZE * len(LEGACY_FILES)
+
+def _row_to_submission(points, allies, status):
+    """Convierte una fila al formato de diccionario que usan los cogs."""
+    submission = {'allies': json.loads(allies)}
+    if points is not None:
+        submission['points'] = points
+    if status != 'pending':
+        submission['status'] = status
+    return submission
+
+def _import_legacy_files(con):
+    """Importa los pending_*/judged_*.json existentes. Devuelve (envíos importados, archivos procesados)."""
+    now = datetime.now(timezone.utc).isoformat()
+    imported, processed = 0, []
+    for kind, (pending_file, judged_file) in LEGACY_FILES.items():
+        # Primero los juzgados: si un envío aparece en ambos archivos, prevalece la decisión.
+        for filename in (judged_file, pending_file):
+            if not os.path.exists(filename):
+                continue
+            try:
+                with open(filename, 'r') as f: data = json.load(f)
+            except json.JSONDecodeError:
+                data = {}
+            for message_id, submission in data.items():
+                cur = con.execute(
+                    "INSERT OR IGNORE INTO submissions (message_id, kind, points, allies, status, created_at, judged_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (int(message_id), kind, submission.get('points'), json.dumps(submission.get('allies', [])),
+                     submission.get('status', 'pending'), now, now if 'status' in submission else None))
+                imported += cur.rowcount
+            processed.append(filename)
+    return imported, processed
+
+class JudgedCache:
+    """
+    Envíos juzgados de un tipo: los más recientes viven en una LRU en memoria (acceso O(1)) y
+    los antiguos se leen de la tabla `submissions` bajo demanda, así la memoria no crece con la temporada.
+    """
+    def __init__(self, store: 'SubmissionStore', kind: str, capacity: int = JUDGED_CACHE_SIZE):
+        self.store = store
+        self.kind = kind
+        self.capacity = capacity
+        self._hot = OrderedDict()
+        self.cold_hits = 0
+
+    def __setitem__(self, message_id: str, submission: dict):
+        self._hot[message_id] = submission
+        self._hot.move_to_end(message_id)
+        while len(self._hot) > self.capacity:
+            self._hot.popitem(last=False)
+
+    def __len__(self):
+        return len(self._hot)
+
+    async def get(self, message_id: str):
+        """Devuelve el envío juzgado o None si el mensaje no es un envío juzgado de este tipo."""
+        submission = self._hot.get(message_id)
+        if submission is not None:
+            self._hot.move_to_end(message_id)
+            return submission
+        submission = await self.store.get_judged(self.kind, message_id)
+        if submission is not None:
+            self.cold_hits += 1
+            self[message_id] = submission
+        return submission
+
+class SubmissionStore:
+    """
+    Acceso a la tabla `submissions` con actualizaciones fila a fila.
+    Los cogs mantienen sus diccionarios en memoria para las búsquedas y escriben aquí cada cambio.
+    """
+    def __init__(self, db):
+        self.db = db
+        self._ready_lock = asyncio.Lock()
+        self._ready = False
+        # Índice message_id -> tipo de los envíos pendientes y de los juzgados recientes, usado por el
+        # Enrutador (ver kind_of). Los juzgados más antiguos no se guardan: se resuelven por el canal.
+        self._pending_index = {}
+        self._recent_index = OrderedDict()
+
+    async def ready(self):
+        """Asegura el esquema y ejecuta (una sola vez) la importación de los JSON heredados."""
+        async with self._ready_lock:
+            if self._ready:
+                return
+            await self.db.migrate()
+            imported, processed = await self.db.run_write(_import_legacy_files, label='submissions_import')
+            for filename in processed:
+                os.replace(filename, filename + '.imported')
+            if processed:
+                print(f"Importados {imported} envíos desde {len(processed)} archivo(s) JSON heredados.")
+            rows = await self.db.fetchall("SELECT message_id, kind FROM submissions WHERE status = 'pending'", label='submissions_index')
+            self._pending_index.update(rows)
+            rows = await self.db.fetchall(
+                "SELECT message_id, kind FROM submissions WHERE status != 'pending' ORDER BY judged_at DESC, message_id DESC LIMIT ?",
+                (RECENT_INDEX_SIZE,), label='submissions_index_recent')
+            for message_id, kind in reversed(rows):
+                self._remember_judged(message_id, kind)
+            self._ready = True
+
+    def kind_of(self, message_id: int):
+        """Tipo de un envío pendiente o juzgado recientemente, o None si no está en el índice."""
+        kind = self._pending_index.get(message_id)
+        if kind is None:
+            kind = self._recent_index.get(message_id)
+            if kind is not None:
+                self._recent_index.move_to_end(message_id)
+        return kind
+
+    def _remember_judged(self, message_id: int, kind: str):
+        self._recent_index[message_id] = kind
+        self._recent_index.move_to_end(message_id)
+        while len(self._recent_index) > RECENT_INDEX_SIZE:
+            self._recent_index.popitem(last=False)
+
+    async def load(self, kind: str):
+        """
+        Devuelve (pendientes, juzgados) de un tipo. Los pendientes son un diccionario `{message_id_str: submission}`;
+        los juzgados, una JudgedCache precargada solo con los más recientes.
+        """
+        await self.ready()
+        rows = await self.db.fetchall("SELECT message_id, points, allies, status FROM submissions WHERE kind = ? AND status = 'pending'", (kind,), label='submissions_load_pending')
+        pending = {str(message_id): _row_to_submission(points, allies, status) for message_id, points, allies, status in rows}
+
+        judged = JudgedCache(self, kind)
+        rows = await self.db.fetchall(
+            "SELECT message_id, points, allies, status FROM submissions WHERE kind = ? AND status != 'pending' ORDER BY judged_at DESC, message_id DESC LIMIT ?",
+            (kind, judged.capacity), label='submissions_load_judged')
+        for message_id, points, allies, status in reversed(rows):
+            judged[str(message_id)] = _row_to_submission(points, allies, status)
+        return pending, judged
+
+    async def get_judged(self, kind: str, message_id):
+        row = await self.db.fetchone(
+            "SELECT points, allies, status FROM submissions WHERE message_id = ? AND kind = ? AND status != 'pending'",
+            (int(message_id), kind), label='submissions_get_judged')
+        return _row_to_submission(*row) if row else None
+
+    async def add_pending(self, kind: str, message, submission: dict):
+        self._recent_index.pop(message.id, None)
+        self._pending_index[message.id] = kind
+        await self.db.execute(
+            "INSERT OR REPLACE INTO submissions (message_id, kind, guild_id, channel_id, points, allies, status, created_at) VALUES (?, ?, ?, ?, ?, ?, 'pending', ?)",
+            (message.id, kind, message.guild.id if message.guild else None, message.channel.id, submission.get('points'),
+             json.dumps(submission['allies']), datetime.now(timezone.utc).isoformat()),
+            label='submissions_add')
+
+    async def set_status(self, message_id, submission: dict, judged_by: int):
+        """Guarda la decisión (o el cambio de decisión) de un envío."""
+        kind = self._pending_index.pop(int(message_id), None) or self._recent_index.get(int(message_id))
+        if kind is not None:
+            self._remember_judged(int(message_id), kind)
+        await self.db.execute(
+            "UPDATE submissions SET status = ?, points = ?, judged_by = ?, judged_at = ? WHERE message_id = ?",
+            (submission['status'], submission.get('points'), judged_by, datetime.now(timezone.utc).isoformat(), int(message_id)),
+            label='submissions_judge')